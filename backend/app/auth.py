@@ -1,21 +1,32 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+import hashlib
 import jwt
-from .database import get_session
+import time
+from .database import get_async_session, read_session_maker, recent_writes
 from .config import settings
 from .models import User
+from .services.dashboard_cache import dashboard_cache
+from .services.auth_cache import token_cache, user_cache
 
 # This is used for Swagger UI support
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
+# Requests with these methods don't write, so they don't pin the user's reads to the primary
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def _decode_user_id(token: str) -> int:
     """
-    Verifies the JWT Access Token and returns the current user.
+    Verifies the JWT Access Token and returns the user id it was issued for.
+    A verified token is remembered (by hash) until it expires, so it is only decoded once.
     """
-    print(f'FULL HEADER: {token}')
-    print(f'SECRET USED: {settings.SECRET_KEY}')
-    print(f'ALGORITHM: {settings.ALGORITHM}')
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    user_id = token_cache.get(token_key)
+    if user_id is not None:
+        return user_id
 
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -48,8 +59,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    user = session.get(User, int(user_id))
+
+    user_id = int(user_id)
+    if payload.get("exp"):
+        token_cache.put(token_key, user_id, payload["exp"])
+    return user_id
+
+async def _load_user(session: AsyncSession, user_id: int, attach: bool = True) -> User:
+    """
+    The user's row, from the user cache when it is there (see services/auth_cache.py).
+    With `attach` the user is merged into `session` without a query, so it can be written
+    through it; otherwise the cached copy itself is returned and must not be modified.
+    """
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return await session.merge(cached, load=False) if attach else cached
+
+    user = await session.get(User, user_id)
     
     if not user:
         raise HTTPException(
@@ -58,4 +84,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return user
\ No newline at end of file
+    if settings.AUTH_USER_CACHE_TTL:
+        # Cache a copy: this instance belongs to the request's session and may be changed through it
+        copy = User(**user.model_dump())
+        make_transient_to_detached(copy)
+        user_cache.put(user_id, copy, time.time() + settings.AUTH_USER_CACHE_TTL)
+    return user
+
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session)
+) -> User:
+    """
+    Verifies the JWT Access Token and returns the current user, loaded from the primary.
+    """
+    user_id = _decode_user_id(token)
+    if request.method not in SAFE_METHODS:
+        # The request may write: keep this user's reads on the primary for a while, and
+        # stop serving dashboards cached before it (writers bump again once committed)
+        recent_writes.mark(user_id)
+        dashboard_cache.invalidate(user_id)
+    return await _load_user(session, user_id)
+
+async def get_read_session(token: str = Depends(oauth2_scheme)):
+    """
+    Dependency for read-only endpoints: a session on the read replica, or on the primary
+    when no replica is configured or the user wrote recently (see read_session_maker).
+    """
+    async with read_session_maker(_decode_user_id(token))() as session:
+        yield session
+
+async def get_current_reader(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_read_session)) -> User:
+    """
+    get_current_user for read-only endpoints: the user is loaded through get_read_session.
+    Never write to the returned user.
+    """
+    return await _load_user(session, _decode_user_id(token), attach=False)
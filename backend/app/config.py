@@ -15,6 +15,11 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5137")
+
+    # Auth caches (see services/auth_cache.py): verified tokens until they expire, user rows briefly
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL: int = 30 # seconds (0 disables); changes made by other processes show up after this
     
     # Integrations
     NOTION_API_KEY: str = ""
@@ -23,6 +28,77 @@ class Settings(BaseSettings):
     NOTION_CLIENT_ID: str = ""
     NOTION_CLIENT_SECRET: str = ""
 
+    # Apply pending migrations (app/migrations/versions) when the app starts
+    RUN_MIGRATIONS_ON_STARTUP: bool = True
+
+    # Database engines (see database.py)
+    DATABASE_ECHO: bool = False # log every SQL statement
+    DATABASE_POOL_SIZE: int = 5 # connections kept open per engine
+    DATABASE_MAX_OVERFLOW: int = 10 # extra connections opened under load
+    DATABASE_POOL_PRE_PING: bool = True # check connections before use, replacing ones the server closed
+
+    # SQLite profile: pragmas set on every connection, and a single writer thread
+    SQLITE_BUSY_TIMEOUT: int = 5000 # ms a connection waits for the write lock before "database is locked"
+    SQLITE_CACHE_SIZE_KB: int = 65536 # page cache per connection
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024 # bytes of the file read through mmap (0 disables)
+    SQLITE_WRITE_QUEUE: bool = True # run small write transactions on one writer thread
+    SQLITE_WRITE_BATCH: int = 64 # most queued transactions committed together
+
+    # Optional read replica for read-only endpoints (empty: every query goes to DATABASE_URL)
+    DATABASE_REPLICA_URL: str = ""
+    REPLICA_READ_YOUR_WRITES_SECONDS: int = 30 # reads stay on the primary this long after a user's write (keep above replica lag)
+
+    # Google endpoints; override to point at a local fake when testing
+    GOOGLE_TOKEN_URI: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_API_ROOT: str = ""
+
+    # Background calendar sync (users who granted offline access)
+    BACKGROUND_SYNC_ENABLED: bool = True
+    BACKGROUND_SYNC_CONCURRENCY: int = 5
+    BACKGROUND_SYNC_MIN_INTERVAL: int = 300 # seconds
+    BACKGROUND_SYNC_MAX_INTERVAL: int = 3600 # seconds
+
+    # Meeting classification (see services/meeting_classifier.py)
+    MEETING_PROVIDER_DOMAINS: str = "" # extra conferencing domains/keywords, comma-separated (e.g. "whereby.com,around.co")
+    MEETING_ROOM_PATTERNS: str = "" # room names marking in-person meetings, comma-separated (e.g. "conf room,boardroom")
+    UNRECORDED_MAX_ATTENDEES: int = 0 # online calls with at most this many attendees are Unrecorded (0 disables)
+    MEETING_RULES_FILE: str = "" # JSON list of extra ClassificationRule dicts, evaluated first
+
+    # Stale-while-revalidate: /dashboard/today serves stored meetings and refreshes them
+    # in the background once the last sync is older than this
+    DASHBOARD_MAX_AGE: int = 300 # seconds
+
+    # Per-user cache of rendered /dashboard responses (see services/dashboard_cache.py);
+    # keep the TTL below DASHBOARD_MAX_AGE so polls still notice when a refresh is due
+    DASHBOARD_CACHE_SIZE: int = 1000 # responses kept per process, least recently used dropped first
+    DASHBOARD_CACHE_TTL: int = 60 # seconds (0 disables the cache)
+
+    # Single-flight sync: concurrent /sync calls for a user share one run
+    SYNC_FRESHNESS_SECONDS: int = 10 # a sync this recent is returned instead of starting another
+    SYNC_LEASE_TTL: int = 120 # seconds before a crashed worker's lease can be taken over
+    SYNC_WAIT_TIMEOUT: int = 60 # seconds a caller waits for an in-flight sync
+
+    # Historical backfill: the range is imported window by window, a few windows at a time
+    BACKFILL_WINDOW_DAYS: int = 7
+    BACKFILL_CONCURRENCY: int = 3 # windows fetched in parallel
+    BACKFILL_REQUESTS_PER_SECOND: float = 5.0 # Calendar API budget shared by all backfills in a process
+    BACKFILL_MAX_DAYS: int = 730
+    BACKFILL_STALE_AFTER: int = 600 # seconds without progress before a running backfill is resumed
+
+    # Archival: resolved days that started more than this many days ago move to the archive
+    # tables nightly; days with open action items stay live until resolved (0 disables archival)
+    ARCHIVE_AFTER_DAYS: int = 0
+    ARCHIVE_BATCH_SIZE: int = 500 # meetings moved per transaction
+
+    # Meeting text: Meeting.summary keeps this many characters; the full text is stored
+    # compressed in MeetingContent and loaded on demand
+    SUMMARY_PREVIEW_CHARS: int = 500
+
+    # Push sync: public HTTPS URL of /webhooks/google/calendar (empty disables watch channels)
+    CALENDAR_WEBHOOK_URL: str = ""
+    WATCH_CHANNEL_TTL: int = 7 * 24 * 3600 # seconds, Google caps calendar channels at ~1 week
+    WATCH_CHANNEL_RENEW_MARGIN: int = 24 * 3600 # seconds before expiry to renew
+
     class Config:
         env_file = str(BASE_DIR / ".env")
         extra = "ignore" # Ignore extra fields in .env
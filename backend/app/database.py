@@ -1,23 +1,254 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from .config import settings
+import asyncio
+import queue
+import threading
+import time
+
+T = TypeVar("T")
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _is_sqlite_memory(url: str) -> bool:
+    return _is_sqlite(url) and (url.rstrip("/") in ("sqlite:", "sqlite+aiosqlite:") or ":memory:" in url or "mode=memory" in url)
+
+def _engine_options(url: str) -> dict:
+    """
+    Pool and logging settings shared by every engine.
+    In-memory SQLite lives in a single connection, so it takes no pool size.
+    """
+    options = {"echo": settings.DATABASE_ECHO, "pool_pre_ping": settings.DATABASE_POOL_PRE_PING}
+    if not _is_sqlite_memory(url):
+        options.update(pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW)
+    return options
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the writer; with WAL, synchronous=NORMAL stays
+    # crash-safe and only syncs at checkpoints. busy_timeout makes a connection wait
+    # for the write lock instead of failing straight away.
+    for pragma in (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+    ):
+        cursor.execute(pragma)
+    cursor.close()
+
+def _use_sqlite_profile(engine: Engine, url: str):
+    if _is_sqlite(url):
+        event.listen(engine, "connect", _sqlite_pragmas)
 
 # Handle SQLite specific configuration
-connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+connect_args = {"check_same_thread": False} if _is_sqlite(settings.DATABASE_URL) else {}
 
 # Create the database engine
-engine = create_engine(settings.DATABASE_URL, echo=True, connect_args=connect_args)
+engine = create_engine(settings.DATABASE_URL, connect_args=connect_args, **_engine_options(settings.DATABASE_URL))
+_use_sqlite_profile(engine, settings.DATABASE_URL)
+
+def _async_database_url(url: str) -> Tuple[str, dict]:
+    """
+    Maps DATABASE_URL onto its async driver: aiosqlite for SQLite, asyncpg for Postgres.
+    """
+    if url.startswith("sqlite"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1), {}
 
-def init_db():
+    scheme, rest = url.split("://", 1)
+    parts = urlsplit("postgresql+asyncpg://" + rest)
+    query = dict(parse_qsl(parts.query))
+    # asyncpg takes ssl as a connect argument and doesn't understand libpq's sslmode
+    sslmode = query.pop("sslmode", None)
+    async_connect_args = {"ssl": sslmode} if sslmode and sslmode != "disable" else {}
+    return urlunsplit(parts._replace(query=urlencode(query))), async_connect_args
+
+# Async engine for request handlers that only talk to the database, so a slow query
+# waits on the event loop instead of holding one of the threadpool's threads
+async_database_url, async_connect_args = _async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(async_database_url, connect_args=async_connect_args, **_engine_options(async_database_url))
+_use_sqlite_profile(async_engine.sync_engine, async_database_url)
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Read replica for read-only endpoints (see read_session_maker); None when not configured
+replica_async_engine = None
+replica_session_maker = None
+if settings.DATABASE_REPLICA_URL:
+    replica_database_url, replica_connect_args = _async_database_url(settings.DATABASE_REPLICA_URL)
+    replica_async_engine = create_async_engine(replica_database_url, connect_args=replica_connect_args, **_engine_options(replica_database_url))
+    _use_sqlite_profile(replica_async_engine.sync_engine, replica_database_url)
+    replica_session_maker = async_sessionmaker(replica_async_engine, class_=AsyncSession, expire_on_commit=False)
+
+class RecentWrites:
     """
-    Create the database tables based on the SQLModel metadata.
+    Remembers which users wrote in the last `window` seconds, so their reads can go to the
+    primary until the replica has caught up (read-your-writes). Kept in process memory.
+    """
+    def __init__(self, window: int):
+        self.window = window
+        self.until: Dict[int, float] = {}
+        self.lock = threading.Lock()
+
+    def mark(self, user_id: int):
+        now = time.monotonic()
+        with self.lock:
+            self.until[user_id] = now + self.window
+            # Drop expired markers now and then so the dict doesn't grow with every user ever seen
+            if len(self.until) > 1000:
+                self.until = {uid: until for uid, until in self.until.items() if until > now}
+
+    def is_recent(self, user_id: int) -> bool:
+        with self.lock:
+            until = self.until.get(user_id)
+        return until is not None and until > time.monotonic()
+
+recent_writes = RecentWrites(settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+def read_session_maker(user_id: int) -> async_sessionmaker:
+    """
+    Session factory for a read-only request: the replica, unless there is none or the
+    user wrote recently enough that the replica may not have their change yet.
+    """
+    if replica_session_maker is None or recent_writes.is_recent(user_id):
+        return async_session_maker
+    return replica_session_maker
+
+class WriteQueue:
+    """
+    Single writer for SQLite, which lets one connection write at a time: concurrent writers
+    queue up on the file lock and fail with "database is locked" once busy_timeout runs out.
+
+    Small write transactions are queued here instead and run by one thread on its own
+    connection. It takes whatever has queued up (at most `max_batch` jobs), runs each job in
+    a SAVEPOINT of one BEGIN IMMEDIATE transaction and commits once, so a burst of writes
+    takes the lock and syncs the WAL once. A job that raises only rolls back its savepoint;
+    its exception is raised to whoever submitted it.
+
+    Used for the request-path writes (see run_write and run_write_async). Background
+    bookkeeping (token refreshes, channels, scheduling, backfill progress, nightly jobs)
+    still writes on its own connection and relies on busy_timeout.
+    """
+    def __init__(self, url: str, max_batch: int):
+        self.engine = create_engine(
+            url, echo=settings.DATABASE_ECHO, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0
+        )
+        event.listen(self.engine, "connect", _sqlite_pragmas)
+        event.listen(self.engine, "connect", self._manual_transactions)
+        # Take the write lock when the transaction starts: a deferred transaction that reads
+        # first can't wait for the lock when it later writes
+        event.listen(self.engine, "begin", lambda connection: connection.exec_driver_sql("BEGIN IMMEDIATE"))
+        self.max_batch = max_batch
+        self.jobs: "queue.Queue[Tuple[Callable[[Session], object], Future]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _manual_transactions(dbapi_connection, connection_record):
+        # Leave BEGIN to SQLAlchemy (see the "begin" listener) instead of pysqlite's implicit one
+        dbapi_connection.isolation_level = None
+
+    def submit(self, fn: Callable[[Session], T]) -> "Future[T]":
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                    self.thread.start()
+        future: Future = Future()
+        self.jobs.put((fn, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._apply(batch)
+
+    def _apply(self, batch: List[Tuple[Callable[[Session], object], Future]]):
+        done = []
+        try:
+            with Session(self.engine, expire_on_commit=False) as session:
+                for fn, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with session.begin_nested():
+                            done.append((future, fn(session)))
+                    except Exception as e:
+                        future.set_exception(e)
+                session.commit()
+        except Exception as e:
+            for future, _ in done:
+                future.set_exception(e)
+            return
+        for future, result in done:
+            future.set_result(result)
+
+# In-memory databases are private to their connection, so they can't have a separate writer
+write_queue: Optional[WriteQueue] = None
+if settings.SQLITE_WRITE_QUEUE and _is_sqlite(settings.DATABASE_URL) and not _is_sqlite_memory(settings.DATABASE_URL):
+    write_queue = WriteQueue(settings.DATABASE_URL, settings.SQLITE_WRITE_BATCH)
+
+def run_write(fn: Callable[[Session], T]) -> T:
+    """
+    Runs `fn(session)` as a small write transaction and commits it: on the SQLite writer
+    thread when there is one, otherwise in a session of its own. For threads (services, jobs).
+    """
+    if write_queue is not None:
+        return write_queue.submit(fn).result()
+    with Session(engine, expire_on_commit=False) as session:
+        result = fn(session)
+        session.commit()
+        return result
+
+async def run_write_async(session: AsyncSession, fn: Callable[[Session], T]) -> T:
+    """
+    run_write for `async def` endpoints. Without the writer thread, `fn` runs in the
+    request's own session (AsyncSession.run_sync) and that session is committed.
+    """
+    if write_queue is not None:
+        return await asyncio.wrap_future(write_queue.submit(fn))
+    result = await session.run_sync(fn)
+    await session.commit()
+    return result
+
+def init_db(run_migrations: Optional[bool] = None):
+    """
+    Create the database tables based on the SQLModel metadata, then apply pending
+    migrations (columns and indexes create_all can't add to existing tables).
     This should be called on application startup.
     """
+    from . import models # registers the tables when called outside the app (migrate_db.py)
     SQLModel.metadata.create_all(engine)
 
+    if settings.RUN_MIGRATIONS_ON_STARTUP if run_migrations is None else run_migrations:
+        from .migrations import run_migrations as apply_migrations
+        apply_migrations(engine)
+
 def get_session():
     """
     Dependency to provide a database session to API endpoints.
     Yields a session and closes it after the request is finished.
     """
     with Session(engine) as session:
+        yield session
+
+async def get_async_session():
+    """
+    Async counterpart of get_session for `async def` endpoints.
+    Objects stay loaded after commit (expire_on_commit=False), since lazy loads can't run
+    implicitly under asyncio; load relationships up front with selectinload.
+    """
+    async with async_session_maker() as session:
         yield session
\ No newline at end of file
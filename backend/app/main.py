@@ -3,7 +3,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database import init_db
 from .config import settings
-from .routers import dashboard, meetings, actions, auth, notifications
+from .routers import dashboard, meetings, actions, auth, notifications, webhooks
 from .services.scheduler import start_scheduler, stop_scheduler
 
 @asynccontextmanager
@@ -40,6 +40,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"], # /dashboard/history pagination
 )
 
 app.include_router(dashboard.router)
@@ -47,6 +48,7 @@ app.include_router(meetings.router)
 app.include_router(actions.router)
 app.include_router(auth.router)
 app.include_router(notifications.router)
+app.include_router(webhooks.router)
 
 @app.get("/")
 def read_root():
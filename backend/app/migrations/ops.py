@@ -0,0 +1,104 @@
+from typing import List
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateTable
+
+# Idempotent schema operations for migrations. Databases created by create_all (or patched
+# by the old migrate_db.py steps) may already have any of these, so each checks first.
+
+def quote(connection: Connection, name: str) -> str:
+    # "user" is a reserved word on Postgres
+    return connection.dialect.identifier_preparer.quote(name)
+
+def is_autocommit(connection: Connection) -> bool:
+    return connection.get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+
+def has_column(connection: Connection, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(connection).get_columns(table)}
+
+def has_index(connection: Connection, table: str, columns: List[str], unique: bool = False) -> bool:
+    """
+    True if an index (or, for unique=True, a unique constraint) already covers exactly `columns`.
+    """
+    inspector = inspect(connection)
+    for index in inspector.get_indexes(table):
+        if index["column_names"] == columns and (index["unique"] or not unique):
+            return True
+    if unique:
+        return any(c["column_names"] == columns for c in inspector.get_unique_constraints(table))
+    return False
+
+def add_column(connection: Connection, table: str, column: str, column_type: str) -> bool:
+    if has_column(connection, table, column):
+        return False
+    connection.execute(text(f"ALTER TABLE {quote(connection, table)} ADD COLUMN {column} {column_type}"))
+    print(f"✅ Added '{column}' column to '{table}' table.")
+    return True
+
+def create_index(connection: Connection, name: str, table: str, columns: List[str], unique: bool = False) -> bool:
+    """
+    Creates an index unless an equivalent one exists.
+    On Postgres, from a non-transactional migration, it is built with CREATE INDEX CONCURRENTLY
+    so reads and writes to the table continue while it builds. A concurrent build that failed
+    leaves an INVALID index behind; that is dropped and rebuilt.
+    """
+    postgres = connection.dialect.name == "postgresql"
+    concurrently = "CONCURRENTLY " if postgres and is_autocommit(connection) else ""
+
+    if postgres:
+        invalid = connection.execute(text(
+            "SELECT NOT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+        ), {"name": name}).scalar()
+        if invalid:
+            print(f"⚠️ Index '{name}' is invalid (interrupted build), rebuilding.")
+            connection.execute(text(f"DROP INDEX {concurrently}IF EXISTS {quote(connection, name)}"))
+
+    if has_index(connection, table, columns, unique):
+        return False
+
+    column_list = ", ".join(quote(connection, column) for column in columns)
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {concurrently}IF NOT EXISTS {quote(connection, name)} "
+        f"ON {quote(connection, table)} ({column_list})"
+    ))
+    print(f"✅ Created index '{name}' on '{table}' ({', '.join(columns)}).")
+    return True
+
+def rebuild_sqlite_table(connection: Connection, table: Table) -> bool:
+    """
+    Recreates a SQLite table from its current model definition (for changes ALTER TABLE
+    can't make, such as AUTOINCREMENT), keeping its rows and its indexes. Returns False if
+    the stored definition already matches the model's.
+    """
+    stored = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+    ).scalar()
+    create = str(CreateTable(table).compile(dialect=connection.dialect)).strip()
+    # SQLite quotes the name of a renamed table in the stored definition
+    if stored is None or " ".join(stored.replace('"', "").split()) == " ".join(create.replace('"', "").split()):
+        return False
+
+    name, new_name = quote(connection, table.name), quote(connection, f"{table.name}_new")
+    # Left behind if an earlier run failed before its copy was committed
+    connection.execute(text(f"DROP TABLE IF EXISTS {new_name}"))
+    connection.execute(text(create.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {new_name} ", 1)))
+
+    columns = ", ".join(
+        quote(connection, c["name"]) for c in inspect(connection).get_columns(table.name) if c["name"] in table.c
+    )
+    # Indexes made by earlier migrations; unique constraints are part of the new definition
+    indexes = connection.execute(text(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"
+    ), {"name": table.name}).all()
+    constraints = {constraint.name for constraint in table.constraints}
+
+    connection.execute(text(f"INSERT INTO {new_name} ({columns}) SELECT {columns} FROM {name}"))
+    connection.execute(text(f"DROP TABLE {name}"))
+    connection.execute(text(f"ALTER TABLE {new_name} RENAME TO {name}"))
+    for index_name, sql in indexes:
+        if index_name not in constraints:
+            connection.execute(text(sql))
+    for index in table.indexes:
+        index.create(connection, checkfirst=True)
+    print(f"✅ Rebuilt '{table.name}' table.")
+    return True
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from datetime import datetime
+from types import ModuleType
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+import importlib
+import pkgutil
+import re
+
+from . import versions
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# Postgres advisory lock key; keeps several workers starting at once from migrating twice
+MIGRATION_LOCK_ID = 7_351_204
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def transactional(self) -> bool:
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction; such migrations
+        # set TRANSACTIONAL = False and must be safe to re-run if interrupted
+        return getattr(self.module, "TRANSACTIONAL", True)
+
+def discover_migrations() -> List[Migration]:
+    migrations = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        match = re.fullmatch(r"v(\d+)_(\w+)", info.name)
+        if match:
+            module = importlib.import_module(f"{versions.__name__}.{info.name}")
+            migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    migrations.sort(key=lambda m: m.version)
+    if len({m.version for m in migrations}) != len(migrations):
+        raise RuntimeError("Duplicate migration versions")
+    return migrations
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    Applies every migration newer than the database's recorded version (up to `target`).
+    Applied versions are recorded in the schema_migrations table. Returns the versions applied.
+    """
+    postgres = engine.dialect.name == "postgresql"
+    applied_now = []
+
+    with engine.connect() as lock_connection:
+        if postgres:
+            lock_connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            lock_connection.commit()
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} "
+                    "(version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+                ))
+                applied = {row[0] for row in connection.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))}
+
+            for migration in discover_migrations():
+                if migration.version in applied or (target is not None and migration.version > target):
+                    continue
+                print(f"--- [MIGRATE] Applying {migration.version:04d}_{migration.name} ---")
+
+                if migration.transactional:
+                    with engine.begin() as connection:
+                        migration.module.upgrade(connection)
+                        _record(connection, migration)
+                else:
+                    with engine.connect() as connection:
+                        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+                        migration.module.upgrade(connection)
+                    with engine.begin() as connection:
+                        _record(connection, migration)
+                applied_now.append(migration.version)
+        finally:
+            if postgres:
+                lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                lock_connection.commit()
+
+    if applied_now:
+        print(f"--- [MIGRATE] Applied {len(applied_now)} migration(s) ---")
+    return applied_now
+
+def _record(connection, migration: Migration):
+    connection.execute(
+        text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+        {"version": migration.version, "name": migration.name, "applied_at": datetime.utcnow()}
+    )
+
+if __name__ == "__main__":
+    from ..database import engine
+    run_migrations(engine)
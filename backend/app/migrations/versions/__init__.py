@@ -0,0 +1,2 @@
+# Versioned schema migrations, applied in order by app.migrations.runner.
+# Name new files vNNNN_short_description.py and define upgrade(connection).
@@ -0,0 +1,25 @@
+from sqlalchemy.engine import Connection
+
+from ..ops import add_column
+
+# The columns migrate_db.py used to add one ALTER TABLE at a time (steps 1-5 and 7-10).
+# Databases that already ran those steps, or were created by create_all, skip them.
+COLUMNS = [
+    ("user", "password_hash", "VARCHAR"),
+    ("user", "integrations_config", "VARCHAR"),
+    ("user", "notification_preferences", "VARCHAR"),
+    ("user", "notion_access_token", "VARCHAR"),
+    ("user", "notion_bot_id", "VARCHAR"),
+    ("user", "google_access_token", "VARCHAR"),
+    ("calendarsyncstate", "next_sync_at", "TIMESTAMP"),
+    ("calendarsyncstate", "sync_interval", "INTEGER"),
+    ("calendarsyncstate", "channel_id", "VARCHAR"),
+    ("calendarsyncstate", "channel_resource_id", "VARCHAR"),
+    ("calendarsyncstate", "channel_token", "VARCHAR"),
+    ("calendarsyncstate", "channel_expiration", "TIMESTAMP"),
+    ("meeting", "content_hash", "VARCHAR"),
+]
+
+def upgrade(connection: Connection):
+    for table, column, column_type in COLUMNS:
+        add_column(connection, table, column, column_type)
@@ -0,0 +1,27 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from ..ops import create_index
+
+# Built with CREATE UNIQUE INDEX CONCURRENTLY on Postgres
+TRANSACTIONAL = False
+
+def upgrade(connection: Connection):
+    """
+    Unique (user_id, google_event_id) on meeting, required by the sync upserts.
+    Duplicates left by the old delete-and-reinsert sync are merged first: their action
+    items move to the oldest copy, then the extra copies are deleted.
+    """
+    duplicates = connection.execute(text(
+        "SELECT user_id, google_event_id, MIN(id) FROM meeting "
+        "GROUP BY user_id, google_event_id HAVING COUNT(*) > 1"
+    )).all()
+    for user_id, google_event_id, keep_id in duplicates:
+        params = {"user_id": user_id, "google_event_id": google_event_id, "keep_id": keep_id}
+        extra_ids = "SELECT id FROM meeting WHERE user_id = :user_id AND google_event_id = :google_event_id AND id != :keep_id"
+        connection.execute(text(f"UPDATE actionitem SET meeting_id = :keep_id WHERE meeting_id IN ({extra_ids})"), params)
+        connection.execute(text(f"DELETE FROM meeting WHERE id IN ({extra_ids})"), params)
+    if duplicates:
+        print(f"✅ Merged {len(duplicates)} duplicated synced meetings.")
+
+    create_index(connection, "uq_meeting_user_event", "meeting", ["user_id", "google_event_id"], unique=True)
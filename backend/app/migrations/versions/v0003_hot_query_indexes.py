@@ -0,0 +1,12 @@
+from sqlalchemy.engine import Connection
+
+from ..ops import create_index
+
+# Built with CREATE INDEX CONCURRENTLY on Postgres
+TRANSACTIONAL = False
+
+def upgrade(connection: Connection):
+    # Dashboard, history and reminder queries: a user's meetings in a start_time range
+    create_index(connection, "ix_meeting_user_id_start_time", "meeting", ["user_id", "start_time"])
+    # Open action items of a set of meetings (is_resolved, unresolved reminders)
+    create_index(connection, "ix_actionitem_meeting_id_is_completed", "actionitem", ["meeting_id", "is_completed"])
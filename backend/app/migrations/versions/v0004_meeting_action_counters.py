@@ -0,0 +1,11 @@
+from sqlalchemy.engine import Connection
+
+from ..ops import add_column
+from ...services.action_counters import recount_action_counts
+
+def upgrade(connection: Connection):
+    # Denormalized action item counts (see services/action_counters.py)
+    add_column(connection, "meeting", "open_action_count", "INTEGER NOT NULL DEFAULT 0")
+    add_column(connection, "meeting", "total_action_count", "INTEGER NOT NULL DEFAULT 0")
+    # Fill them in for meetings that already have action items
+    connection.execute(recount_action_counts())
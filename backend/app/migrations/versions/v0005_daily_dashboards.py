@@ -0,0 +1,8 @@
+from sqlalchemy.engine import Connection
+
+from ...services.daily_dashboards import rebuild_statements
+
+def upgrade(connection: Connection):
+    # create_all made the DailyDashboard table; snapshot the days that already have meetings
+    for statement in rebuild_statements():
+        connection.execute(statement)
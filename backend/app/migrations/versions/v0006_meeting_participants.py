@@ -0,0 +1,8 @@
+from sqlalchemy.engine import Connection
+from sqlmodel import Session
+
+from ...services.participant_index import rebuild_participant_index
+
+def upgrade(connection: Connection):
+    # create_all made the MeetingParticipant table; index the meetings that already exist
+    rebuild_participant_index(Session(bind=connection))
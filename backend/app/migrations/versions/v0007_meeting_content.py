@@ -0,0 +1,8 @@
+from sqlalchemy.engine import Connection
+from sqlmodel import Session
+
+from ...services.meeting_content import compact_summaries
+
+def upgrade(connection: Connection):
+    # create_all made the MeetingContent table; move long summaries into it
+    compact_summaries(Session(bind=connection))
@@ -0,0 +1,15 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from ..ops import add_column, create_index
+
+def upgrade(connection: Connection):
+    """
+    Meeting.ical_uid, and the MeetingSource table create_all made. Sync fills both in when
+    it lists a window in full, so the stored sync tokens and content hashes are dropped:
+    the next sync of every user is a full listing that rewrites the window's meetings.
+    """
+    add_column(connection, "meeting", "ical_uid", "VARCHAR")
+    create_index(connection, "ix_meeting_user_id_ical_uid", "meeting", ["user_id", "ical_uid"])
+    connection.execute(text("UPDATE calendarsyncstate SET sync_token = NULL"))
+    connection.execute(text("UPDATE meeting SET content_hash = NULL"))
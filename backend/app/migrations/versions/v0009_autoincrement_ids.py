@@ -0,0 +1,30 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from ..ops import rebuild_sqlite_table
+from ...models import Meeting, ActionItem
+
+# Tables whose ids must not be reused, and the tables that keep ids of their deleted rows
+ID_HOLDERS = {
+    "meeting": ("SELECT MAX(id) FROM meeting", "SELECT MAX(id) FROM meetingarchive", "SELECT MAX(meeting_id) FROM meetingcontent"),
+    "actionitem": ("SELECT MAX(id) FROM actionitem", "SELECT MAX(id) FROM actionitemarchive"),
+}
+
+def upgrade(connection: Connection):
+    """
+    AUTOINCREMENT on meeting and actionitem. Without it SQLite hands out max(id) + 1, so
+    once the newest rows were archived (or deleted) their ids went to new rows, which then
+    matched archived meetings, their action items and their stored content. Postgres ids
+    come from sequences, which never reuse one.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    rebuild_sqlite_table(connection, Meeting.__table__)
+    rebuild_sqlite_table(connection, ActionItem.__table__)
+
+    # New ids start above every id still held by an archived row
+    for table, queries in ID_HOLDERS.items():
+        floor = max(connection.execute(text(query)).scalar() or 0 for query in queries)
+        params = {"name": table, "seq": floor}
+        if not connection.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :seq) WHERE name = :name"), params).rowcount:
+            connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), params)
@@ -0,0 +1,11 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+def upgrade(connection: Connection):
+    """
+    Sync used to store event times as given by Google, which the database kept as the
+    wall-clock time of the event's zone; they are naive UTC now, like the sync window and
+    the DailyDashboard days. Dropping the content hashes makes the next sync rewrite every
+    meeting in its window (and refresh the snapshots of both days).
+    """
+    connection.execute(text("UPDATE meeting SET content_hash = NULL"))
@@ -0,0 +1,8 @@
+from sqlalchemy.engine import Connection
+from sqlmodel import Session
+
+from ...services.meeting_archive import MeetingArchiveService
+
+def upgrade(connection: Connection):
+    # Open action items archived by earlier versions could no longer be completed
+    MeetingArchiveService(Session(bind=connection)).restore_unresolved()
@@ -1,8 +1,8 @@
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from sqlmodel import Field, SQLModel, Relationship
 from enum import Enum
-from sqlalchemy import Column, String, JSON
+from sqlalchemy import Column, String, JSON, Index, LargeBinary, UniqueConstraint
 
 class MeetingType(str, Enum):
     ONLINE = "Online"
@@ -23,6 +23,7 @@ class User(SQLModel, table=True):
     name: Optional[str] = None
     picture: Optional[str] = None
     google_refresh_token: Optional[str] = None
+    google_access_token: Optional[str] = None
     google_token_expiry: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -35,6 +36,17 @@ class User(SQLModel, table=True):
     meetings: List["Meeting"] = Relationship(back_populates="user")
 
 class Meeting(SQLModel, table=True):
+    __table_args__ = (
+        # Sync upserts rely on this (ON CONFLICT (user_id, google_event_id))
+        UniqueConstraint("user_id", "google_event_id", name="uq_meeting_user_event"),
+        # A user's meetings in a start_time range (dashboard, history, reminders)
+        Index("ix_meeting_user_id_start_time", "user_id", "start_time"),
+        # Sync matches copies of a meeting on other calendars by iCalUID
+        Index("ix_meeting_user_id_ical_uid", "user_id", "ical_uid"),
+        # Ids are never handed out twice: archived meetings keep theirs (meetingarchive, meetingcontent)
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     google_event_id: str = Field(index=True)
@@ -45,11 +57,24 @@ class Meeting(SQLModel, table=True):
     participants: List[str] = Field(default=[], sa_column=Column(JSON))
     type: MeetingType
     summary: Optional[str] = None
+    # Hash of the calendar-owned fields at the last sync; unchanged events are not rewritten
+    content_hash: Optional[str] = None
+    # The event's iCalUID, which its copies on the user's other calendars share
+    ical_uid: Optional[str] = None
+    # Maintained alongside the action items (services/action_counters.py); resolved when open is 0
+    open_action_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    total_action_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     
     user: User = Relationship(back_populates="meetings")
     action_items: List["ActionItem"] = Relationship(back_populates="meeting")
 
 class ActionItem(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_actionitem_meeting_id_is_completed", "meeting_id", "is_completed"),
+        # Archived action items keep their ids (actionitemarchive)
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     meeting_id: int = Field(foreign_key="meeting.id")
     description: str
@@ -58,6 +83,169 @@ class ActionItem(SQLModel, table=True):
     
     meeting: Meeting = Relationship(back_populates="action_items")
 
+class MeetingParticipant(SQLModel, table=True):
+    """
+    One row per (meeting, participant email): the Meeting.participants JSON list, indexed
+    so a user's meetings with a contact are found without scanning every meeting.
+    Rewritten by sync whenever a meeting changes (services/participant_index.py).
+    """
+    __table_args__ = (
+        # A user's meetings with one contact, newest first
+        Index("ix_meetingparticipant_user_id_email_start_time", "user_id", "email", "start_time"),
+    )
+
+    meeting_id: int = Field(foreign_key="meeting.id", primary_key=True)
+    email: str = Field(primary_key=True) # lowercased
+    user_id: int = Field(foreign_key="user.id")
+    start_time: datetime # copy of the meeting's, for ordering within the index
+
+class MeetingSource(SQLModel, table=True):
+    """
+    One row per calendar event a synced meeting was merged from. The same meeting can be on
+    several of the user's calendars (with the same event id or its own); sync only deletes
+    the meeting once the last calendar holding a copy drops it (services/calendar_sync.py).
+    """
+    __table_args__ = (Index("ix_meetingsource_meeting_id", "meeting_id"),)
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    calendar_id: str = Field(primary_key=True)
+    google_event_id: str = Field(primary_key=True) # the copy's id on that calendar
+    meeting_id: int = Field(foreign_key="meeting.id")
+
+class ContentKind(str, Enum):
+    DESCRIPTION = "description" # the calendar event's description
+    TRANSCRIPT = "transcript" # fetched from a content provider or sent to /process
+    NOTES = "notes" # sent to /analyze
+    SUMMARY = "summary" # written by the AI
+
+class MeetingContent(SQLModel, table=True):
+    """
+    Full text of a meeting's description, transcripts, notes and AI summaries, zlib-compressed.
+    Meeting.summary only keeps a preview, so dashboard queries stay small; these rows are
+    read on demand (services/meeting_content.py). The same text is stored once per meeting
+    and kind. No foreign key on meeting_id: the content stays when the meeting is archived,
+    keyed to the archived meeting, whose id is never given to another one (sqlite_autoincrement).
+    """
+    meeting_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    kind: ContentKind = Field(primary_key=True)
+    content_hash: str = Field(primary_key=True) # sha1 of the text
+    compression: str = "zlib"
+    size: int # length of the text, in characters
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    stored_at: datetime = Field(default_factory=datetime.utcnow) # last time this text was stored
+
+class CalendarSyncState(SQLModel, table=True):
+    """
+    Incremental sync bookkeeping for one of a user's Google calendars.
+    The sync token is only valid for the window it was issued for.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    calendar_id: str = Field(default="primary")
+    sync_token: Optional[str] = None
+    window_start: Optional[datetime] = None
+    window_end: Optional[datetime] = None
+    synced_at: Optional[datetime] = None
+    # Background sync schedule (seconds between syncs adapts to calendar activity)
+    next_sync_at: Optional[datetime] = Field(default=None, index=True)
+    sync_interval: Optional[int] = None
+    # Push notifications: the events.watch channel for this calendar, if any
+    channel_id: Optional[str] = Field(default=None, index=True)
+    channel_resource_id: Optional[str] = None
+    channel_token: Optional[str] = None
+    channel_expiration: Optional[datetime] = None
+
+class SyncLease(SQLModel, table=True):
+    """
+    Per-user calendar sync lease, shared by all workers.
+    While `owner` is set a sync is in flight; afterwards the row keeps its outcome
+    so concurrent and follow-up callers can reuse it.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    owner: Optional[str] = None
+    started_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[str] = None # JSON-encoded SyncResult
+    error: Optional[str] = None
+
+class CalendarBackfill(SQLModel, table=True):
+    """
+    A historical import of a user's calendar over [range_start, range_end].
+    Everything before `checkpoint` has been imported, so an interrupted backfill resumes there.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    range_start: datetime
+    range_end: datetime
+    window_days: int = 7
+    checkpoint: Optional[datetime] = None
+    status: str = Field(default="pending", index=True) # pending, running, completed, failed
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DailyDashboard(SQLModel, table=True):
+    """
+    Snapshot of one user's day (UTC): how many meetings and action items it has and whether
+    it is resolved. Recomputed whenever that day's meetings or action items change
+    (services/daily_dashboards.py), so history and heatmaps read one row per day.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    meeting_count: int = 0
+    open_action_count: int = 0
+    total_action_count: int = 0
+    is_resolved: bool = True
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class MeetingArchive(SQLModel, table=True):
+    """
+    Meetings that started before the archive horizon (ARCHIVE_AFTER_DAYS), moved out of
+    `meeting` by services/meeting_archive.py. Ids are kept, so history pages over both
+    tables with one (start_time, id) cursor. On Postgres the table is range-partitioned
+    by start_time (one partition per month), which is why start_time is part of the key.
+    """
+    __table_args__ = (
+        Index("ix_meetingarchive_user_id_start_time", "user_id", "start_time"),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    start_time: datetime = Field(primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    google_event_id: str
+    title: str
+    end_time: datetime
+    participants: List[str] = Field(default=[], sa_column=Column(JSON))
+    type: MeetingType
+    summary: Optional[str] = None
+    content_hash: Optional[str] = None
+    open_action_count: int = 0
+    total_action_count: int = 0
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+    action_items: List["ActionItemArchive"] = Relationship(sa_relationship_kwargs={
+        "primaryjoin": "MeetingArchive.id == foreign(ActionItemArchive.meeting_id)",
+        "viewonly": True,
+    })
+
+class ActionItemArchive(SQLModel, table=True):
+    """
+    Open action items of archived meetings, from before archival kept unresolved days live
+    (migration 0011 moves them back). Completed ones are not kept: they live on only in
+    their meeting's counters and the day's DailyDashboard row.
+    """
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    meeting_id: int = Field(index=True)
+    description: str
+    is_completed: bool = False
+    suggested_action: ActionType
+
 class ActionItemRead(SQLModel):
     id: int
     meeting_id: int
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import update as sql_update
+from sqlalchemy.orm import selectinload
 from typing import Optional
 from pydantic import BaseModel
 from ..models import ActionType
 
-from ..database import get_session
+from ..database import get_async_session, run_write_async
 from ..models import User, Meeting, ActionItem
 from ..auth import get_current_user
 from ..services.actions.factory import ActionExecutorFactory
+from ..services.action_counters import adjust_action_counts
+from ..services.daily_dashboards import refresh_daily_dashboards
+from ..services.dashboard_cache import dashboard_cache
 from typing import Dict, Any
 
 router = APIRouter(prefix="/actions", tags=["actions"])
@@ -23,63 +30,75 @@ class CreateActionItemRequest(BaseModel):
     suggested_action: ActionType = ActionType.CREATE_TASK
 
 @router.post("/", status_code=201)
-def create_action_item(
+async def create_action_item(
     request: CreateActionItemRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Create a new manual action item for a meeting.
     """
-    # Verify meeting ownership
-    meeting = session.get(Meeting, request.meeting_id)
-    if not meeting or meeting.user_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Meeting not found")
-
-    action_item = ActionItem(
-        meeting_id=request.meeting_id,
-        description=request.description,
-        suggested_action=request.suggested_action,
-        is_completed=False
-    )
-    session.add(action_item)
-    session.commit()
-    session.refresh(action_item)
+    # Small write transactions go through the database writer (one writer thread on SQLite)
+    def create(session: Session) -> ActionItem:
+        # Verify meeting ownership
+        meeting = session.get(Meeting, request.meeting_id)
+        if not meeting or meeting.user_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Meeting not found")
+
+        action_item = ActionItem(
+            meeting_id=request.meeting_id,
+            description=request.description,
+            suggested_action=request.suggested_action,
+            is_completed=False
+        )
+        session.add(action_item)
+        session.execute(adjust_action_counts(request.meeting_id, open_delta=1, total_delta=1))
+        refresh_daily_dashboards(session, meeting.user_id, [meeting.start_time.date()])
+        session.flush()
+        return action_item
+
+    action_item = await run_write_async(session, create)
+    dashboard_cache.invalidate(current_user.id)
     return action_item
 
 @router.patch("/{action_id}")
-def update_action_item(
+async def update_action_item(
     action_id: int,
     request: UpdateActionItemRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Update an action item's status or details.
     """
-    # Join with Meeting to verify user ownership
-    statement = select(ActionItem, Meeting).join(Meeting).where(
-        ActionItem.id == action_id,
-        Meeting.user_id == current_user.id
-    )
-    result = session.exec(statement).first()
-    
-    if not result:
-        raise HTTPException(status_code=404, detail="Action item not found")
-        
-    action_item, _ = result
-    
-    if request.description is not None:
-        action_item.description = request.description
-    if request.is_completed is not None:
-        action_item.is_completed = request.is_completed
-    if request.suggested_action is not None:
-        action_item.suggested_action = request.suggested_action
-        
-    session.add(action_item)
-    session.commit()
-    session.refresh(action_item)
-    
+    def apply_changes(session: Session) -> ActionItem:
+        # Join with Meeting to verify user ownership
+        statement = select(ActionItem, Meeting).join(Meeting).where(
+            ActionItem.id == action_id,
+            Meeting.user_id == current_user.id
+        )
+        result = session.exec(statement).first()
+
+        if not result:
+            raise HTTPException(status_code=404, detail="Action item not found")
+
+        action_item, meeting = result
+
+        if request.description is not None:
+            action_item.description = request.description
+        if request.is_completed is not None and request.is_completed != action_item.is_completed:
+            action_item.is_completed = request.is_completed
+            session.execute(adjust_action_counts(action_item.meeting_id, open_delta=-1 if request.is_completed else 1))
+            refresh_daily_dashboards(session, meeting.user_id, [meeting.start_time.date()])
+        if request.suggested_action is not None:
+            action_item.suggested_action = request.suggested_action
+
+        session.add(action_item)
+        session.flush()
+        return action_item
+
+    action_item = await run_write_async(session, apply_changes)
+    dashboard_cache.invalidate(current_user.id)
     return action_item
 
 class ExecuteActionRequest(BaseModel):
@@ -87,18 +106,18 @@ class ExecuteActionRequest(BaseModel):
     params: Dict[str, Any] = {}
 
 @router.post("/{action_id}/execute")
-def execute_action(
+async def execute_action(
     action_id: int,
     request: ExecuteActionRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     # Verify ownership
-    statement = select(ActionItem).join(Meeting).where(
+    statement = select(ActionItem).join(Meeting).options(selectinload(ActionItem.meeting)).where(
         ActionItem.id == action_id,
         Meeting.user_id == current_user.id
     )
-    action_item = session.exec(statement).first()
+    action_item = (await session.exec(statement)).first()
 
     if not action_item:
         raise HTTPException(status_code=404, detail="Action item not found")
@@ -116,14 +135,23 @@ def execute_action(
     try:
         executor = ActionExecutorFactory.get_executor(action_item.suggested_action)
         # Pass action_data and user_token as expected by the ActionExecutor interface
-        result = executor.execute(action_data, google_token)
+        # Executors call external APIs with blocking clients, so keep them off the event loop
+        result = await run_in_threadpool(executor.execute, action_data, google_token)
     except Exception as e:
         print(f"Executor failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
-    # Mark as completed
-    action_item.is_completed = True
-    session.add(action_item)
-    session.commit()
+    # Mark as completed; re-checked in the write, since the executor may have run for a while
+    meeting = action_item.meeting
+    def complete(session: Session):
+        completed = session.execute(
+            sql_update(ActionItem).where(ActionItem.id == action_id, ActionItem.is_completed == False).values(is_completed=True)
+        ).rowcount
+        if completed:
+            session.execute(adjust_action_counts(meeting.id, open_delta=-1))
+            refresh_daily_dashboards(session, meeting.user_id, [meeting.start_time.date()])
+
+    await run_write_async(session, complete)
+    dashboard_cache.invalidate(current_user.id)
 
     return result
\ No newline at end of file
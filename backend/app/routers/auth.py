@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 from pydantic import BaseModel, EmailStr
 import requests
@@ -7,11 +9,13 @@ import json
 import urllib.parse
 
 from fastapi.responses import RedirectResponse
-from ..database import get_session
+from ..database import get_session, get_async_session, recent_writes, run_write_async
 from ..models import User
 from ..config import settings
 from ..auth_utils import create_access_token
-from ..auth import get_current_user
+from ..auth import get_current_user, get_current_reader
+from ..services.google_tokens import GoogleTokenService, GoogleTokenError
+from ..services.auth_cache import invalidate_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -23,6 +27,10 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class GoogleOfflineAccessRequest(BaseModel):
+    code: str # Authorization code from a consent requested with access_type=offline
+    redirect_uri: str
+
 class SettingsUpdateRequest(BaseModel):
     integrations: dict
     notifications: dict
@@ -30,7 +38,7 @@ class SettingsUpdateRequest(BaseModel):
 # --- Endpoints ---
 
 @router.post("/google", response_model=Token)
-def google_auth(request: GoogleAuthRequest, session: Session = Depends(get_session)):
+async def google_auth(request: GoogleAuthRequest, session: AsyncSession = Depends(get_async_session)):
     """
     Verifies Google Access Token and creates/updates user.
     Returns app's JWT token.
@@ -38,7 +46,8 @@ def google_auth(request: GoogleAuthRequest, session: Session = Depends(get_sessi
     token = request.token
     try:
         # Verify access token by fetching user info from Google
-        response = requests.get(
+        response = await run_in_threadpool(
+            requests.get,
             "https://www.googleapis.com/oauth2/v3/userinfo",
             headers={"Authorization": f"Bearer {token}"}
         )
@@ -58,33 +67,58 @@ def google_auth(request: GoogleAuthRequest, session: Session = Depends(get_sessi
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error validating Google token: {str(e)}")
 
-    # Check if user exists by email
-    statement = select(User).where(User.email == email)
-    user = session.exec(statement).first()
-
-    if not user:
-        # Create new user
-        user = User(
-            email=email,
-            google_sub=google_sub,
-            name=name,
-            picture=picture
-        )
-        session.add(user)
-    else:
-        # Update existing user with Google info if missing or changed
-        user.google_sub = google_sub
-        user.name = name or user.name
-        user.picture = picture or user.picture
-        session.add(user)
-        
-    session.commit()
-    session.refresh(user)
+    def upsert_user(session: Session) -> int:
+        # Check if user exists by email
+        statement = select(User).where(User.email == email)
+        user = session.exec(statement).first()
+
+        if not user:
+            # Create new user
+            user = User(
+                email=email,
+                google_sub=google_sub,
+                name=name,
+                picture=picture
+            )
+            session.add(user)
+        else:
+            # Update existing user with Google info if missing or changed
+            user.google_sub = google_sub
+            user.name = name or user.name
+            user.picture = picture or user.picture
+            session.add(user)
+        session.flush()
+        return user.id
+
+    # Small write transactions go through the database writer (one writer thread on SQLite)
+    user_id = await run_write_async(session, upsert_user)
+    recent_writes.mark(user_id)
+    invalidate_user(user_id)
     
     # Create app access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data={"sub": str(user_id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
+@router.post("/google/offline")
+def google_offline_access(
+    request: GoogleOfflineAccessRequest,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Stores a Google refresh token for the current user so their calendar
+    can be synced in the background without the frontend.
+    Stays a sync endpoint: the token exchange is a blocking call to Google.
+    """
+    # current_user belongs to the async auth session; write through this one
+    user = session.get(User, current_user.id)
+    try:
+        GoogleTokenService(session).exchange_code(user, request.code, request.redirect_uri)
+    except GoogleTokenError as e:
+        raise HTTPException(status_code=400, detail=f"Error exchanging Google authorization code: {str(e)}")
+
+    return {"message": "Offline access enabled"}
+
 @router.get("/login")
 def login_with_google():
     """
@@ -104,8 +138,8 @@ def login_with_google():
     return RedirectResponse(url)
 
 @router.get("/settings")
-def get_user_settings(
-    current_user: User = Depends(get_current_user),
+async def get_user_settings(
+    current_user: User = Depends(get_current_reader),
 ):
     """
     Get current user settings.
@@ -116,18 +150,21 @@ def get_user_settings(
     }
 
 @router.post("/settings")
-def update_user_settings(
+async def update_user_settings(
     request: SettingsUpdateRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Update user settings.
     """
-    current_user.integrations_config = json.dumps(request.integrations)
-    current_user.notification_preferences = json.dumps(request.notifications)
-    
-    session.add(current_user)
-    session.commit()
+    def save_settings(session: Session):
+        user = session.get(User, current_user.id)
+        user.integrations_config = json.dumps(request.integrations)
+        user.notification_preferences = json.dumps(request.notifications)
+        session.add(user)
+
+    await run_write_async(session, save_settings)
+    invalidate_user(current_user.id)
     
     return {"message": "Settings updated successfully"}
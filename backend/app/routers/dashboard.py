@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from pydantic import TypeAdapter
 from datetime import datetime, date, timedelta
 
-from ..database import get_session
-from ..models import User, Meeting, ActionItem, MeetingType, MeetingRead
-from ..auth import get_current_user
-from ..services.calendar import CalendarService
+from ..database import get_session, read_session_maker
+from ..models import User, Meeting, ActionItem, MeetingType, MeetingRead, CalendarSyncState, SyncLease, DailyDashboard, MeetingArchive
+from ..auth import get_current_user, get_current_reader, get_read_session
+from ..services.calendar import GOOGLE_API_ERRORS
+from ..services.calendar_sync import CalendarSyncService
+from ..services.sync_coordinator import SyncCoordinator, SyncInProgressError, SyncFailedError
+from ..services.scheduler import refresh_user_calendar
+from ..services.meeting_archive import archive_horizon
+from ..services.dashboard_cache import CachedResponse, dashboard_cache
+from ..config import settings
 from ..services.ai import AIService
 from pydantic import BaseModel
+import base64
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -17,6 +28,25 @@ class DashboardResponse(BaseModel):
     date: str
     is_resolved: bool
     meetings: List[MeetingRead]
+    synced_at: Optional[datetime] = None # last calendar sync (UTC); None if never synced
+    refreshing: bool = False # a background sync is running; fetch again to pick up its result
+
+class DaySummary(BaseModel):
+    date: date
+    meeting_count: int
+    open_action_count: int
+    total_action_count: int
+    is_resolved: bool
+
+def _cached_response(cached: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """
+    Sends a cached dashboard response, or 304 when the client already has this version.
+    """
+    # no-cache: browsers keep the body but revalidate it (If-None-Match) on every poll
+    headers = dict(cached.headers, ETag=cached.etag, **{"Cache-Control": "private, no-cache"})
+    if if_none_match and cached.etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 @router.post("/sync", status_code=status.HTTP_200_OK)
 def sync_meetings(
@@ -27,87 +57,49 @@ def sync_meetings(
     """
     Syncs today's meetings from Google Calendar.
     Requires a valid Google Access Token passed in the X-Google-Access-Token header.
+    Stays a sync endpoint (threadpool): it is bound by blocking Google API calls.
     """
-    calendar_service = CalendarService(token=x_google_access_token)
+    # Concurrent requests (double clicks, several tabs, several workers) share one sync
     try:
-        google_meetings = calendar_service.fetch_todays_meetings()
-    except Exception as e:
+        result, coalesced = SyncCoordinator().run(
+            current_user.id,
+            lambda: CalendarSyncService(session).sync_user(current_user, x_google_access_token).to_dict()
+        )
+    except SyncInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except GOOGLE_API_ERRORS as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch from Google Calendar: {str(e)}")
+    except SyncFailedError as e:
+        # Another request's sync, which this one waited for, failed
+        raise HTTPException(status_code=502, detail=f"Calendar sync failed: {str(e)}")
 
-    # 1. Fetch existing local meetings for today to detect deletions
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = datetime.utcnow().replace(hour=23, minute=59, second=59, microsecond=999999)
-    
-    # Simple check: sync covers "today", so we check meetings starting today
-    # Note: CalendarService.fetch_todays_meetings also fetches based on 'today'
-    
-    statement = select(Meeting).where(
-        Meeting.user_id == current_user.id,
-        Meeting.start_time >= today_start,
-        Meeting.start_time <= today_end
-    )
-    existing_local_meetings = session.exec(statement).all()
-    existing_google_ids = {m.google_event_id for m in existing_local_meetings}
-
-    # 2. Process Google Meetings
-    synced_meetings = []
-    fetched_google_ids = set()
-
-    for g_meeting in google_meetings:
-        fetched_google_ids.add(g_meeting.google_event_id)
-        
-        # Check if meeting already exists
-        statement = select(Meeting).where(
-            Meeting.google_event_id == g_meeting.google_event_id,
-            Meeting.user_id == current_user.id
-        )
-        existing_meeting = session.exec(statement).first()
-
-        if existing_meeting:
-            # Update existing meeting details if needed
-            existing_meeting.title = g_meeting.title
-            existing_meeting.start_time = g_meeting.start_time
-            existing_meeting.end_time = g_meeting.end_time
-            existing_meeting.participants = g_meeting.participants
-            existing_meeting.type = g_meeting.type
-            existing_meeting.summary = g_meeting.summary or existing_meeting.summary
-            session.add(existing_meeting)
-            synced_meetings.append(existing_meeting)
-        else:
-            # Create new meeting
-            g_meeting.user_id = current_user.id
-            session.add(g_meeting)
-            synced_meetings.append(g_meeting)
-    
-    # 3. Delete orphans (Local meetings not present in Google fetch)
-    # Re-fetch local meetings to ensure we are operating on current session objects or use the IDs
-    orphaned_ids = existing_google_ids - fetched_google_ids
-    if orphaned_ids:
-        # We need to query again or filter the 'existing_local_meetings' list
-        # It's safer to query by ID to ensure we delete the correct rows associated with this user
-        
-        # Note: 'orphan_id' is the google_event_id string
-        for orphan_id in orphaned_ids:
-            statement = select(Meeting).where(
-                Meeting.google_event_id == orphan_id,
-                Meeting.user_id == current_user.id
-            )
-            orphan_meeting = session.exec(statement).first()
-            if orphan_meeting:
-                session.delete(orphan_meeting)
-    
-    session.commit()
-    return {"message": "Sync successful", "count": len(synced_meetings), "deleted": len(orphaned_ids)}
+    return {
+        "message": "Sync successful",
+        "mode": result["mode"],
+        "coalesced": coalesced,
+        "count": result["inserted"] + result["updated"] + result["unchanged"],
+        "inserted": result["inserted"],
+        "updated": result["updated"],
+        "unchanged": result["unchanged"],
+        "deleted": result["deleted"]
+    }
 
 @router.get("/today", response_model=DashboardResponse)
-def get_todays_dashboard(
+async def get_todays_dashboard(
+    background_tasks: BackgroundTasks,
     time_min: Optional[datetime] = None,
     time_max: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    x_google_access_token: Optional[str] = Header(None, alias="X-Google-Access-Token"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    current_user: User = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get the dashboard data for today.
+    Returns the stored meetings straight away (stale-while-revalidate): if the last sync is
+    older than DASHBOARD_MAX_AGE a background sync is started and `refreshing` is true;
+    fetch again once it finishes (synced_at changes) to get the refreshed meetings.
+    Responses are cached per user until the next write (ETag; If-None-Match gets a 304).
     """
     if time_min and time_max:
         window_start = time_min
@@ -118,75 +110,241 @@ def get_todays_dashboard(
         window_start = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
         window_end = now_utc.replace(hour=23, minute=59, second=59, microsecond=999999)
 
+    cache_key = ("today", window_start, window_end)
+    cached = dashboard_cache.get(current_user.id, cache_key)
+    if cached:
+        return _cached_response(cached, if_none_match)
+    # Read before the queries, so a write committed while they run isn't cached as current
+    version = dashboard_cache.version(current_user.id)
+
+    synced_at, refreshing = await _revalidate(current_user, x_google_access_token, background_tasks, session)
+
     statement = select(Meeting).options(selectinload(Meeting.action_items)).where(
         Meeting.user_id == current_user.id,
         Meeting.start_time >= window_start,
         Meeting.start_time <= window_end
     ).order_by(Meeting.start_time)
     
-    meetings = session.exec(statement).all()
+    meetings = (await session.exec(statement)).all()
     
-    # Calculate if resolved (all action items completed)
     # A dashboard is resolved if all action items across all meetings are completed.
-    # If there are NO meetings, it is resolved.
-    # If there are meetings but NO action items, it is resolved.
-    
-    is_resolved = True
-    has_action_items = False
-    meetings_data = []
-    
-    for meeting in meetings:
-        meetings_data.append(meeting)
-        
-        # Check for unresolved items
-        for item in meeting.action_items:
-            has_action_items = True
-            if not item.is_completed:
-                is_resolved = False
-    
-    # If we have action items and none are incomplete, it's resolved.
-    # If we have no action items at all, it's resolved (nothing to do).
-    # Logic holds: is_resolved starts True, only flips to False if an incomplete item is found.
+    # If there are NO meetings, or meetings but NO action items, it is resolved.
+    # The meetings carry their open action item count, so the items needn't be looked at.
+    is_resolved = all(meeting.open_action_count == 0 for meeting in meetings)
 
-    return {
+    dashboard = DashboardResponse.model_validate({
         "date": date.today().isoformat(),
         "is_resolved": is_resolved,
-        "meetings": meetings_data
-    }
+        "meetings": meetings,
+        "synced_at": synced_at,
+        "refreshing": refreshing
+    }, from_attributes=True)
+    if refreshing:
+        # The background sync is about to change this and the client polls until it has
+        return dashboard
+    cached = dashboard_cache.put(current_user.id, cache_key, version, dashboard.model_dump_json().encode())
+    return _cached_response(cached, if_none_match)
+
+async def _revalidate(user: User, access_token: Optional[str], background_tasks: BackgroundTasks, session: AsyncSession):
+    """
+    Returns (synced_at, refreshing) and queues a background sync when the data is stale.
+    """
+    synced_at = (await session.exec(
+        select(func.max(CalendarSyncState.synced_at)).where(CalendarSyncState.user_id == user.id)
+    )).one()
+
+    now = datetime.utcnow()
+    lease = await session.get(SyncLease, user.id)
+    if lease and lease.owner and lease.expires_at > now:
+        # Someone (another tab, the background job, a webhook) is already syncing
+        return synced_at, True
+
+    if synced_at and synced_at > now - timedelta(seconds=settings.DASHBOARD_MAX_AGE):
+        return synced_at, False
+    if not user.google_refresh_token and not access_token:
+        return synced_at, False
+
+    background_tasks.add_task(refresh_user_calendar, user.id, access_token)
+    return synced_at, True
+
+# Meetings per /history page (the query parameter `limit` can lower or raise it)
+HISTORY_PAGE_SIZE = 200
+
+_history_adapter = TypeAdapter(List[DashboardResponse])
+
+def _encode_cursor(meeting: Meeting) -> str:
+    return base64.urlsafe_b64encode(f"{meeting.start_time.isoformat()}|{meeting.id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        start_time, meeting_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(start_time), int(meeting_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _history_statement(model, user_id: int, window_start: datetime, window_end: datetime, after: Optional[Tuple[datetime, int]], limit: int):
+    """
+    One page of a user's meetings (Meeting or MeetingArchive) in [window_start, window_end),
+    newest first, strictly after the (start_time, id) keyset cursor.
+    Served by the table's (user_id, start_time) index.
+    """
+    statement = select(model).options(selectinload(model.action_items)).where(
+        model.user_id == user_id,
+        model.start_time >= window_start,
+        model.start_time < window_end
+    )
+    if after:
+        start_time, meeting_id = after
+        statement = statement.where(or_(
+            model.start_time < start_time,
+            and_(model.start_time == start_time, model.id < meeting_id)
+        ))
+    return statement.order_by(model.start_time.desc(), model.id.desc()).limit(limit)
+
+async def _history_page(session: AsyncSession, user_id: int, window_start: datetime, window_end: datetime, after: Optional[Tuple[datetime, int]], limit: int) -> list:
+    """
+    Up to `limit` meetings from the live and archive tables merged in keyset order.
+    The archive is only read when the range reaches back past the archive horizon.
+    """
+    meetings = list((await session.exec(_history_statement(Meeting, user_id, window_start, window_end, after, limit))).all())
+    horizon = archive_horizon()
+    if horizon is None or window_start < horizon:
+        meetings += (await session.exec(_history_statement(MeetingArchive, user_id, window_start, window_end, after, limit))).all()
+        meetings.sort(key=lambda meeting: (meeting.start_time, meeting.id), reverse=True)
+    return meetings[:limit]
+
+async def _stream_history(user_id: int, window_start: datetime, window_end: datetime, after: Optional[Tuple[datetime, int]], limit: int):
+    """
+    Yields one NDJSON line per day, newest first, reading the range page by page.
+    Uses its own session: the response body is produced after the endpoint has returned.
+    """
+    async with read_session_maker(user_id)() as session:
+        day, meetings = None, []
+        while True:
+            page = await _history_page(session, user_id, window_start, window_end, after, limit)
+            for meeting in page:
+                if meetings and meeting.start_time.date() != day:
+                    yield _day_line(day, meetings)
+                    meetings = []
+                day = meeting.start_time.date()
+                meetings.append(MeetingRead.model_validate(meeting))
+            if len(page) < limit:
+                break
+            after = (page[-1].start_time, page[-1].id)
+            # Only the current day's meetings are needed from here on
+            session.expunge_all()
+        if meetings:
+            yield _day_line(day, meetings)
+
+def _day_line(day: date, meetings: List[MeetingRead]) -> str:
+    # Days are complete in the stream, so resolved status comes straight from the meetings
+    open_actions = any(not item.is_completed for meeting in meetings for item in meeting.action_items)
+    return DashboardResponse(date=day.isoformat(), is_resolved=not open_actions, meetings=meetings).model_dump_json() + "\n"
 
 @router.get("/history", response_model=List[DashboardResponse])
-def get_past_dashboards(
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+async def get_past_dashboards(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=1000),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    current_user: User = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
-    Get past dashboards (last 7 days).
+    Get past dashboards, newest day first, for the UTC days `from`..`to` (inclusive;
+    default the last 7 days before today).
+
+    JSON: one page of at most `limit` meetings grouped by day. If there is more, the
+    X-Next-Cursor header holds a cursor for the next page (same from/to). A day can
+    continue on the next page; its is_resolved covers the whole day either way.
+    format=ndjson: streams every day in the range, one JSON object per line (export).
+    Archived meetings are included; only their open action items are kept.
+    JSON pages are cached per user until the next write (ETag; If-None-Match gets a 304).
     """
-    # Simplified history logic: Group meetings by date
-    # For MVP, fetching last 7 days of meetings and grouping them in python
-    
-    end_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date = end_date - timedelta(days=7)
-    
-    statement = select(Meeting).options(selectinload(Meeting.action_items)).where(
-        Meeting.user_id == current_user.id,
-        Meeting.start_time >= start_date,
-        Meeting.start_time < end_date
-    ).order_by(Meeting.start_time.desc())
-    
-    meetings = session.exec(statement).all()
-    
-    # Group by date
+    to_date = to_date or datetime.utcnow().date() - timedelta(days=1)
+    from_date = from_date or to_date - timedelta(days=6)
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    window_start = datetime.combine(from_date, datetime.min.time())
+    window_end = datetime.combine(to_date + timedelta(days=1), datetime.min.time())
+    after = _decode_cursor(cursor) if cursor else None
+
+    if output == "ndjson":
+        return StreamingResponse(
+            _stream_history(current_user.id, window_start, window_end, after, limit),
+            media_type="application/x-ndjson"
+        )
+
+    cache_key = ("history", from_date, to_date, after, limit)
+    cached = dashboard_cache.get(current_user.id, cache_key)
+    if cached:
+        return _cached_response(cached, if_none_match)
+    version = dashboard_cache.version(current_user.id)
+
+    # One extra row tells whether there is a next page
+    headers = {}
+    meetings = await _history_page(session, current_user.id, window_start, window_end, after, limit + 1)
+    if len(meetings) > limit:
+        meetings = meetings[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(meetings[-1])
+
     history = {}
     for meeting in meetings:
-        m_date = meeting.start_time.date().isoformat()
-        if m_date not in history:
-            history[m_date] = {"date": m_date, "meetings": [], "is_resolved": True}
-        
-        history[m_date]["meetings"].append(meeting)
-        
-        for item in meeting.action_items:
-            if not item.is_completed:
-                history[m_date]["is_resolved"] = False
-                
-    return list(history.values())
\ No newline at end of file
+        history.setdefault(meeting.start_time.date(), []).append(meeting)
+
+    # A page may hold only part of a day, so resolved status comes from the day's snapshot
+    resolved = dict((await session.exec(
+        select(DailyDashboard.day, DailyDashboard.is_resolved).where(
+            DailyDashboard.user_id == current_user.id,
+            DailyDashboard.day.in_(list(history))
+        )
+    )).all()) if history else {}
+
+    dashboards = _history_adapter.validate_python([
+        {
+            "date": day.isoformat(),
+            "meetings": day_meetings,
+            "is_resolved": resolved.get(day, all(meeting.open_action_count == 0 for meeting in day_meetings))
+        }
+        for day, day_meetings in history.items()
+    ], from_attributes=True)
+    cached = dashboard_cache.put(current_user.id, cache_key, version, _history_adapter.dump_json(dashboards), headers)
+    return _cached_response(cached, if_none_match)
+
+@router.get("/days", response_model=List[DaySummary])
+async def get_day_summaries(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    current_user: User = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Per-day meeting and action item counts (UTC days with meetings), oldest first.
+    Defaults to the last 30 days. Reads the DailyDashboard snapshots, one row per day,
+    so it suits history lists and calendar heatmaps over long ranges.
+    """
+    to_date = to_date or datetime.utcnow().date()
+    from_date = from_date or to_date - timedelta(days=29)
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    statement = select(DailyDashboard).where(
+        DailyDashboard.user_id == current_user.id,
+        DailyDashboard.day >= from_date,
+        DailyDashboard.day <= to_date
+    ).order_by(DailyDashboard.day)
+    days = (await session.exec(statement)).all()
+
+    return [
+        DaySummary(
+            date=day.day,
+            meeting_count=day.meeting_count,
+            open_action_count=day.open_action_count,
+            total_action_count=day.total_action_count,
+            is_resolved=day.is_resolved
+        )
+        for day in days
+    ]
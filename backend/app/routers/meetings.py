@@ -1,25 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from typing import Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional, Tuple
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date
+from sqlalchemy import and_
 from sqlalchemy.orm import selectinload
 import requests
 
-from ..database import get_session
-from ..models import User, Meeting, ActionItem, ActionType, MeetingRead
-from ..auth import get_current_user
+from ..database import get_session, get_async_session, run_write_async
+from ..models import User, Meeting, ActionItem, ActionType, MeetingRead, ActionItemRead, CalendarBackfill, MeetingParticipant, MeetingArchive, ContentKind
+from ..auth import get_current_user, get_current_reader, get_read_session
 from ..services.ai import AIService
 from ..services.content_providers.factory import ContentProviderFactory
 from ..services.content_providers.notion import NotionProvider
 from ..config import settings
 
-from ..services.calendar import CalendarService
+from ..services.calendar import GOOGLE_API_ERRORS
+from ..services.calendar_sync import CalendarSyncService
+from ..services.sync_coordinator import SyncCoordinator, SyncInProgressError, SyncFailedError
+from ..services.calendar_backfill import CalendarBackfillService, BackfillError, run_backfill
+from ..services.meeting_classifier import MeetingClassifierFactory
+from ..services.action_counters import adjust_action_counts
+from ..services.daily_dashboards import refresh_daily_dashboards
+from ..services.dashboard_cache import dashboard_cache
+from ..services.participant_index import normalize_email
+from ..services.meeting_content import SUMMARY_KINDS, content_row, full_summary, latest_content, read_content, store_content, summary_preview
+from ..services.google_tokens import GoogleTokenService, GoogleTokenError
 
 router = APIRouter(prefix="/meetings", tags=["meetings"])
 
 class ProcessMeetingRequest(BaseModel):
     content: Optional[str] = None # Optional now, as we try to fetch if not provided
+    refetch: bool = False # ignore the stored transcript and ask the content providers again
 
 class AnalyzeMeetingRequest(BaseModel):
     notes_text: str
@@ -27,6 +41,11 @@ class AnalyzeMeetingRequest(BaseModel):
 class SyncMeetingsRequest(BaseModel):
     pass # No body needed for now, token is in header or from session if we use that flow later
 
+class BackfillRequest(BaseModel):
+    start_date: date
+    end_date: date
+    window_days: Optional[int] = None
+
 @router.post("/sync")
 def sync_calendar_meetings(
     x_google_access_token: Optional[str] = Header(None, alias="X-Google-Access-Token"),
@@ -35,98 +54,225 @@ def sync_calendar_meetings(
 ):
     """
     Syncs today's meetings from Google Calendar.
-    Accepts X-Google-Access-Token header OR falls back to stored token (if we had it).
-    For now, frontend sends the token.
+    Accepts X-Google-Access-Token header OR falls back to the stored offline token.
+    Only changes since the last sync are fetched while the stored sync token is valid.
+    A sync finished in the last SYNC_FRESHNESS_SECONDS (or one already running) is reused.
+    Stays a sync endpoint (threadpool): it is bound by blocking Google API calls.
     """
+    # current_user belongs to the async auth session; token refreshes and sync writes go through this one
+    user = session.get(User, current_user.id)
+    if not x_google_access_token:
+        try:
+            x_google_access_token = GoogleTokenService(session).get_access_token(user)
+        except GoogleTokenError as e:
+            raise HTTPException(status_code=400, detail=f"Failed to refresh Google token: {str(e)}")
     if not x_google_access_token:
-        # In a real app with offline access, we might refresh the token here.
         raise HTTPException(status_code=400, detail="Google Access Token required for sync")
 
-    calendar_service = CalendarService(token=x_google_access_token)
+    # Concurrent requests (double clicks, several tabs, several workers) share one sync
     try:
-        google_meetings = calendar_service.fetch_todays_meetings()
-    except Exception as e:
+        result, coalesced = SyncCoordinator().run(
+            current_user.id,
+            lambda: CalendarSyncService(session).sync_user(user, x_google_access_token).to_dict()
+        )
+    except SyncInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except GOOGLE_API_ERRORS as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch from Google Calendar: {str(e)}")
+    except SyncFailedError as e:
+        # Another request's sync, which this one waited for, failed
+        raise HTTPException(status_code=502, detail=f"Calendar sync failed: {str(e)}")
 
-    # Track IDs found in Google Calendar to identify deletions
-    fetched_google_ids = set()
-    synced_meetings = []
+    return {
+        "message": "Sync successful",
+        "mode": result["mode"],
+        "coalesced": coalesced,
+        "count": result["inserted"] + result["updated"] + result["unchanged"],
+        "inserted": result["inserted"],
+        "updated": result["updated"],
+        "unchanged": result["unchanged"],
+        "deleted": result["deleted"]
+    }
 
-    for g_meeting in google_meetings:
-        fetched_google_ids.add(g_meeting.google_event_id)
+@router.post("/backfill", response_model=CalendarBackfill)
+def start_backfill(
+    request: BackfillRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Imports meetings from Google Calendar between start_date and end_date (inclusive).
+    Runs in the background with the stored offline token; poll GET /meetings/backfill/{id} for progress.
+    """
+    if not current_user.google_refresh_token:
+        raise HTTPException(status_code=400, detail="Offline Google access required for backfill")
+    try:
+        backfill = CalendarBackfillService(session).create(current_user, request.start_date, request.end_date, request.window_days)
+    except BackfillError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Check if meeting already exists
-        statement = select(Meeting).where(
-            Meeting.google_event_id == g_meeting.google_event_id,
-            Meeting.user_id == current_user.id
-        )
-        existing_meeting = session.exec(statement).first()
-
-        if existing_meeting:
-            # Update existing meeting details
-            existing_meeting.title = g_meeting.title
-            existing_meeting.start_time = g_meeting.start_time
-            existing_meeting.end_time = g_meeting.end_time
-            existing_meeting.participants = g_meeting.participants
-            # Only update type if it wasn't manually overridden? For now, source of truth is calendar.
-            existing_meeting.type = g_meeting.type
-            existing_meeting.summary = g_meeting.summary or existing_meeting.summary
-            session.add(existing_meeting)
-            synced_meetings.append(existing_meeting)
-        else:
-            # Create new meeting
-            g_meeting.user_id = current_user.id
-            session.add(g_meeting)
-            synced_meetings.append(g_meeting)
-    
-    # Handle Deletions: Remove local meetings for the synced window
-    # Must match the expanded window in CalendarService to avoid accidental deletions
-    now = datetime.utcnow()
-    from datetime import timedelta
-    utc_today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    utc_today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-
-    time_min = (utc_today_start - timedelta(days=1))
-    time_max = (utc_today_end + timedelta(days=1))
-
-    print(f"DEBUG: Checking for deletions in window: {time_min} to {time_max}")
-
-    statement = select(Meeting).where(
-        Meeting.user_id == current_user.id,
-        Meeting.start_time >= time_min,
-        Meeting.start_time <= time_max,
-        Meeting.google_event_id != None # Only consider synced meetings
-    )
-    local_meetings = session.exec(statement).all()
-    print(f"DEBUG: Found {len(local_meetings)} local meetings in this window.")
-
-    for meeting in local_meetings:
-        if meeting.google_event_id not in fetched_google_ids:
-            print(f"DEBUG: Deleting orphan meeting {meeting.id} ({meeting.title}) because Google ID {meeting.google_event_id} was not returned.")
-            # Delete associated action items first to avoid integrity errors
-            # Or rely on cascade delete if configured (it seems it's not)
-            # We must manually delete the meeting, which should cascade if SQLModel relationship is set up right
-            # but the error suggests action items are being updated to NULL meeting_id or similar?
-            # Actually, `session.delete(meeting)` should work if cascade is set in DB.
-            # If not, we need to delete children first.
-            
-            # Deleting action items for this meeting
-            # Note: In a real app we might want to keep orphan action items or move them to 'Inbox'
-            # But here we delete them with the meeting as per sync logic
-            for item in meeting.action_items:
-                session.delete(item)
-            
-            session.delete(meeting)
-
-    session.commit()
-    return {"message": "Sync successful", "count": len(synced_meetings), "meetings": synced_meetings}
+    background_tasks.add_task(run_backfill, backfill.id)
+    return backfill
+
+@router.get("/backfill/{backfill_id}", response_model=CalendarBackfill)
+async def get_backfill(
+    backfill_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    backfill = await session.get(CalendarBackfill, backfill_id)
+    if not backfill or backfill.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Backfill not found")
+    return backfill
+
+@router.post("/backfill/{backfill_id}/resume", response_model=CalendarBackfill)
+async def resume_backfill(
+    backfill_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Restarts a failed backfill from its checkpoint.
+    """
+    backfill = await session.get(CalendarBackfill, backfill_id)
+    if not backfill or backfill.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Backfill not found")
+    if backfill.status == "completed":
+        raise HTTPException(status_code=400, detail="Backfill already completed")
+
+    background_tasks.add_task(run_backfill, backfill.id)
+    return backfill
+
+class ContactMeetings(BaseModel):
+    email: str
+    meetings: List[MeetingRead]
+    open_action_items: List[ActionItemRead]
+
+@router.get("/participants/{email}", response_model=ContactMeetings)
+async def get_contact_meetings(
+    email: str,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Meetings with a participant (newest first, at most `limit`) and every open action item
+    from the user's meetings with them. Both are looked up through the participant index.
+    Archived meetings are not included.
+    """
+    email = normalize_email(email)
+    involving = and_(MeetingParticipant.user_id == current_user.id, MeetingParticipant.email == email)
+
+    meetings = (await session.exec(
+        select(Meeting).options(selectinload(Meeting.action_items))
+        .join(MeetingParticipant, MeetingParticipant.meeting_id == Meeting.id)
+        .where(involving)
+        .order_by(MeetingParticipant.start_time.desc())
+        .limit(limit)
+    )).all()
+
+    open_action_items = (await session.exec(
+        select(ActionItem)
+        .join(MeetingParticipant, MeetingParticipant.meeting_id == ActionItem.meeting_id)
+        .where(involving, ActionItem.is_completed == False)
+        .order_by(MeetingParticipant.start_time.desc(), ActionItem.id)
+    )).all()
+
+    return {"email": email, "meetings": meetings, "open_action_items": open_action_items}
+
+async def _save_analysis(
+    session: AsyncSession,
+    meeting_id: int,
+    summary: str,
+    contents: List[dict],
+    actions: List[Tuple[str, ActionType]]
+) -> Meeting:
+    """
+    Stores an AI result (summary, content rows, new action items as (description, action))
+    in one write transaction and returns the meeting with its action items.
+    """
+    def save(session: Session) -> int:
+        meeting = session.get(Meeting, meeting_id)
+        # The row keeps a preview, the full text goes to MeetingContent
+        meeting.summary = summary_preview(summary)
+        session.add(meeting)
+        store_content(session, contents)
+        for description, suggested_action in actions:
+            session.add(ActionItem(
+                meeting_id=meeting_id,
+                description=description,
+                suggested_action=suggested_action,
+                is_completed=False
+            ))
+        session.execute(adjust_action_counts(meeting_id, open_delta=len(actions), total_delta=len(actions)))
+        refresh_daily_dashboards(session, meeting.user_id, [meeting.start_time.date()])
+        return meeting.user_id
+
+    # Small write transactions go through the database writer (one writer thread on SQLite)
+    user_id = await run_write_async(session, save)
+    dashboard_cache.invalidate(user_id)
+    # Re-fetch meeting with fresh action items; the write may have happened in another session
+    statement = select(Meeting).options(selectinload(Meeting.action_items)).where(
+        Meeting.id == meeting_id
+    ).execution_options(populate_existing=True)
+    return (await session.exec(statement)).first()
+
+async def _owned_meeting(session: AsyncSession, meeting_id: int, user_id: int):
+    """
+    The user's meeting with this id, live or archived; 404 otherwise.
+    """
+    for model in (Meeting, MeetingArchive):
+        meeting = (await session.exec(select(model).where(model.id == meeting_id, model.user_id == user_id))).first()
+        if meeting:
+            return meeting
+    raise HTTPException(status_code=404, detail="Meeting not found")
+
+@router.get("/{meeting_id}/summary")
+async def get_meeting_summary(
+    meeting_id: int,
+    current_user: User = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    The full summary (AI summary or event description) of which meeting lists only carry a preview.
+    """
+    meeting = await _owned_meeting(session, meeting_id, current_user.id)
+    content = (await session.exec(latest_content(meeting_id, SUMMARY_KINDS))).first()
+    return {"summary": full_summary(meeting.summary, content)}
+
+@router.get("/{meeting_id}/content/{kind}")
+async def get_meeting_content(
+    meeting_id: int,
+    kind: ContentKind,
+    current_user: User = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    The latest stored text of one kind (description, transcript, notes or summary) for a meeting.
+    Descriptions are only stored when they are longer than the summary preview.
+    """
+    await _owned_meeting(session, meeting_id, current_user.id)
+    content = (await session.exec(latest_content(meeting_id, [kind]))).first()
+    if not content:
+        raise HTTPException(status_code=404, detail=f"No {kind.value} stored for this meeting")
+    return {"kind": kind, "text": read_content(content), "size": content.size, "stored_at": content.stored_at}
+
+@router.get("/classification/stats")
+async def get_classification_stats(current_user: User = Depends(get_current_user)):
+    """
+    How often each classification rule decided a meeting's type, since this worker started.
+    Use it to tune MEETING_PROVIDER_DOMAINS / MEETING_ROOM_PATTERNS / MEETING_RULES_FILE.
+    """
+    return MeetingClassifierFactory.get_classifier().stats()
 
 @router.post("/{meeting_id}/process", response_model=MeetingRead)
-def process_meeting(
+async def process_meeting(
     meeting_id: int,
     request: ProcessMeetingRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Process a meeting's content using AI to generate a summary and extract action items.
@@ -134,12 +280,19 @@ def process_meeting(
     """
     # Fetch meeting and verify ownership
     statement = select(Meeting).where(Meeting.id == meeting_id, Meeting.user_id == current_user.id)
-    meeting = session.exec(statement).first()
+    meeting = (await session.exec(statement)).first()
     
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
 
     meeting_content = request.content
+    contents = []
+
+    # Re-processing reuses the transcript stored the last time instead of fetching it again
+    if not meeting_content and not request.refetch:
+        stored = (await session.exec(latest_content(meeting.id, [ContentKind.TRANSCRIPT]))).first()
+        if stored:
+            meeting_content = read_content(stored)
 
     # If content not provided by frontend, try content providers
     if not meeting_content:
@@ -147,51 +300,42 @@ def process_meeting(
         meeting_date = meeting.start_time.date().isoformat()
         
         for provider in providers:
-            fetched_content = provider.fetch_content(current_user, meeting.title, meeting_date)
+            # Providers and the AI client make blocking HTTP calls; keep them off the event loop
+            fetched_content = await run_in_threadpool(provider.fetch_content, current_user, meeting.title, meeting_date)
             if fetched_content:
                 meeting_content = fetched_content
+                contents.append(content_row(meeting.id, ContentKind.TRANSCRIPT, fetched_content))
                 break
+    elif request.content:
+        contents.append(content_row(meeting.id, ContentKind.TRANSCRIPT, request.content))
     
     if not meeting_content:
         # Fallback if nothing found
         meeting_content = "No content found for this meeting."
 
     ai_service = AIService()
-    result = ai_service.process_meeting(
+    result = await run_in_threadpool(
+        ai_service.process_meeting,
         meeting_title=meeting.title,
         meeting_content=meeting_content,
         participants=meeting.participants
     )
     
-    # Update meeting summary
-    meeting.summary = result.get("summary", "")
-    session.add(meeting)
+    summary = result.get("summary", "")
+    if summary:
+        contents.append(content_row(meeting.id, ContentKind.SUMMARY, summary))
     
     # Create action items
-    extracted_actions = result.get("action_items", [])
-    for item in extracted_actions:
-        action_item = ActionItem(
-            meeting_id=meeting.id,
-            description=item.get("description"),
-            suggested_action=item.get("suggested_action"),
-            is_completed=False
-        )
-        session.add(action_item)
-        
-    session.commit()
-    # Re-fetch meeting with fresh action items
-    statement = select(Meeting).options(selectinload(Meeting.action_items)).where(Meeting.id == meeting.id)
-    meeting = session.exec(statement).first()
-    
-    return meeting
+    actions = [(item.get("description"), item.get("suggested_action")) for item in result.get("action_items", [])]
+    return await _save_analysis(session, meeting.id, summary, contents, actions)
 
 @router.get("/{meeting_id}/fetch-notes")
-def fetch_meeting_notes(
+async def fetch_meeting_notes(
     meeting_id: int,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: User = Depends(get_current_reader),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    meeting = session.get(Meeting, meeting_id)
+    meeting = await session.get(Meeting, meeting_id)
     if not meeting or meeting.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Meeting not found")
 
@@ -202,7 +346,7 @@ def fetch_meeting_notes(
     if not provider:
         raise HTTPException(status_code=500, detail="Notion provider not found")
 
-    notes = provider.fetch_content(current_user, meeting.title, meeting.start_time.isoformat())
+    notes = await run_in_threadpool(provider.fetch_content, current_user, meeting.title, meeting.start_time.isoformat())
     
     if not notes:
         return {"notes": ""}
@@ -210,11 +354,11 @@ def fetch_meeting_notes(
     return {"notes": notes}
 
 @router.post("/{meeting_id}/analyze", response_model=MeetingRead)
-def analyze_meeting(
+async def analyze_meeting(
     meeting_id: int,
     request: AnalyzeMeetingRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
     Analyze meeting notes to extract next steps using Groq AI.
@@ -222,24 +366,28 @@ def analyze_meeting(
     """
     # Fetch meeting and verify ownership
     statement = select(Meeting).where(Meeting.id == meeting_id, Meeting.user_id == current_user.id)
-    meeting = session.exec(statement).first()
+    meeting = (await session.exec(statement)).first()
     
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
 
+    contents = [content_row(meeting.id, ContentKind.NOTES, request.notes_text)] if request.notes_text else []
+
     ai_service = AIService()
-    result = ai_service.process_meeting(
+    result = await run_in_threadpool(
+        ai_service.process_meeting,
         meeting_title=meeting.title,
         meeting_content=request.notes_text,
         participants=meeting.participants
     )
     
-    # Update meeting summary
-    meeting.summary = result.get("summary", "")
-    session.add(meeting)
+    summary = result.get("summary", "")
+    if summary:
+        contents.append(content_row(meeting.id, ContentKind.SUMMARY, summary))
     
     # Create action items
     extracted_actions = result.get("action_items", [])
+    actions = []
     
     # Optional: Clear existing action items?
     # For now, we append. In a real app, maybe we'd diff or replace.
@@ -266,17 +414,5 @@ def analyze_meeting(
         if assignee and assignee.lower() != "me":
             description = f"[{assignee}] {description}"
 
-        action_item = ActionItem(
-            meeting_id=meeting.id,
-            description=description,
-            suggested_action=suggested_action,
-            is_completed=False
-        )
-        session.add(action_item)
-        
-    session.commit()
-    # Re-fetch meeting with fresh action items
-    statement = select(Meeting).options(selectinload(Meeting.action_items)).where(Meeting.id == meeting.id)
-    meeting = session.exec(statement).first()
-    
-    return meeting
\ No newline at end of file
+        actions.append((description, suggested_action))
+    return await _save_analysis(session, meeting.id, summary, contents, actions)
\ No newline at end of file
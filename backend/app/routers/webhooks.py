@@ -0,0 +1,52 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response, status
+from sqlmodel import Session
+from typing import Optional, Set
+import threading
+
+from ..database import get_session
+from ..services.calendar_watch import CalendarWatchService
+from ..services.scheduler import sync_user_calendar
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+# Users with a webhook-triggered sync queued (not yet started) in this process.
+# Google often sends several notifications for one change; they collapse into one sync.
+_pending_user_ids: Set[int] = set()
+_pending_lock = threading.Lock()
+
+def _run_sync(user_id: int):
+    with _pending_lock:
+        _pending_user_ids.discard(user_id)
+    # The change happened after any sync already running started, so that one can't be
+    # reused (max_age=0); SyncCoordinator waits for it and then syncs again.
+    sync_user_calendar(user_id, max_age=0)
+
+@router.post("/google/calendar", status_code=status.HTTP_200_OK)
+def google_calendar_notification(
+    background_tasks: BackgroundTasks,
+    x_goog_channel_id: str = Header(..., alias="X-Goog-Channel-ID"),
+    x_goog_resource_state: str = Header(..., alias="X-Goog-Resource-State"),
+    x_goog_channel_token: Optional[str] = Header(None, alias="X-Goog-Channel-Token"),
+    session: Session = Depends(get_session)
+):
+    """
+    Receives Google Calendar push notifications (events.watch channels).
+    Only headers are sent; a change triggers a delta sync for the channel's user.
+    To simulate one locally, POST with the X-Goog-* headers of a channel stored in calendarsyncstate.
+    """
+    state = CalendarWatchService(session).find_channel(x_goog_channel_id, x_goog_channel_token)
+    if not state:
+        raise HTTPException(status_code=403, detail="Unknown channel")
+
+    # "sync" is the handshake Google sends right after a channel is created
+    if x_goog_resource_state == "sync":
+        return Response(status_code=status.HTTP_200_OK)
+
+    with _pending_lock:
+        if state.user_id in _pending_user_ids:
+            return {"message": "Sync already queued"}
+        _pending_user_ids.add(state.user_id)
+
+    print(f"--- [WEBHOOK] Calendar '{state.calendar_id}' changed for user {state.user_id} ({x_goog_resource_state}) ---")
+    background_tasks.add_task(_run_sync, state.user_id)
+    return {"message": "Sync queued"}
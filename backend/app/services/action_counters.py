@@ -0,0 +1,56 @@
+from typing import List, Optional
+from sqlmodel import Session
+from sqlalchemy import Update, and_, func, or_, select, update
+
+from ..database import engine
+from ..models import Meeting, ActionItem
+from .dashboard_cache import dashboard_cache
+
+# Meeting.open_action_count / total_action_count mirror the meeting's action items so
+# resolved status needs no children. Writers change both in the same transaction:
+# an atomic `count = count + delta` when they add or complete items, or a recount of
+# the meeting when they replace many at once. repair_action_counters() fixes any drift
+# (rows written by scripts, or by code from before the counters).
+
+def _open_count():
+    return select(func.count(ActionItem.id)).where(
+        ActionItem.meeting_id == Meeting.id, ActionItem.is_completed == False
+    ).scalar_subquery()
+
+def _total_count():
+    return select(func.count(ActionItem.id)).where(ActionItem.meeting_id == Meeting.id).scalar_subquery()
+
+def adjust_action_counts(meeting_id: int, open_delta: int = 0, total_delta: int = 0) -> Update:
+    """
+    UPDATE statement moving a meeting's counters by the given deltas.
+    Execute it in the session that makes the matching action item change.
+    """
+    return update(Meeting).where(Meeting.id == meeting_id).values(
+        open_action_count=Meeting.open_action_count + open_delta,
+        total_action_count=Meeting.total_action_count + total_delta
+    )
+
+def recount_action_counts(meeting_ids: Optional[List[int]] = None) -> Update:
+    """
+    UPDATE statement recomputing the counters from the action items, for the given
+    meetings or (None) every meeting. Only rows whose counters are off are written.
+    """
+    open_count, total_count = _open_count(), _total_count()
+    drifted = or_(Meeting.open_action_count != open_count, Meeting.total_action_count != total_count)
+    condition = drifted if meeting_ids is None else and_(Meeting.id.in_(meeting_ids), drifted)
+    return update(Meeting).where(condition).values(
+        open_action_count=open_count, total_action_count=total_count
+    ).execution_options(synchronize_session=False)
+
+def repair_action_counters() -> int:
+    """
+    Job to recompute every meeting's action counters in bulk.
+    Returns the number of meetings that were corrected.
+    """
+    with Session(engine) as session:
+        repaired = session.execute(recount_action_counts()).rowcount
+        session.commit()
+    if repaired:
+        dashboard_cache.invalidate_all()
+        print(f"--- [COUNTERS] Repaired action counters of {repaired} meetings ---")
+    return repaired
@@ -39,12 +39,12 @@ class GmailExecutor(ActionExecutor):
         
         try:
             from google.oauth2.credentials import Credentials
-            from googleapiclient.discovery import build
+            from ..google_clients import GoogleClientFactory
             import base64
             from email.mime.text import MIMEText
 
             creds = Credentials(token=user_token)
-            service = build('gmail', 'v1', credentials=creds)
+            service = GoogleClientFactory.get_service('gmail', 'v1')
 
             message = MIMEText(body)
             if recipient:
@@ -60,7 +60,9 @@ class GmailExecutor(ActionExecutor):
                 }
             }
             
-            draft = service.users().drafts().create(userId='me', body=create_message).execute()
+            draft = service.users().drafts().create(userId='me', body=create_message).execute(
+                http=GoogleClientFactory.authorized_http(creds)
+            )
             
             draft_id = draft.get('id')
             message_id = draft.get('message', {}).get('id')
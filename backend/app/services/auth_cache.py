@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import threading
+import time
+
+from ..config import settings
+
+class ExpiringLRU:
+    """
+    LRU of at most `max_entries` values, each dropped at its own expiry (a time.time()
+    timestamp), kept in process memory.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, expires_at: float):
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self.lock:
+            self.entries.pop(key, None)
+
+# User ids of verified access tokens, by SHA-256 of the token, until the token's exp
+token_cache = ExpiringLRU(settings.AUTH_TOKEN_CACHE_SIZE)
+
+# Detached copies of User rows loaded by the auth dependencies, for AUTH_USER_CACHE_TTL seconds
+user_cache = ExpiringLRU(settings.AUTH_USER_CACHE_SIZE)
+
+def invalidate_user(user_id: int):
+    """
+    Call after committing a change to a User row, so the next request loads it again.
+    """
+    user_cache.pop(user_id)
@@ -1,96 +1,331 @@
+from google.auth.exceptions import RefreshError, TransportError
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from datetime import datetime, timedelta
-from typing import List, Optional
-from ..models import Meeting, MeetingType
-import re
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from ..models import MeetingType
+import hashlib
+import json
+from .google_clients import GoogleClientFactory
+from .meeting_classifier import MeetingClassifierFactory
+
+# Events per events().list page (Google's maximum is 2500)
+PAGE_SIZE = 250
+
+# Requests per Google batch HTTP call (Google's maximum is 50)
+MAX_BATCH_SIZE = 50
+
+# What the Calendar API raises when Google rejects a call or the access token, or can't be
+# reached (socket.timeout and connection errors are OSErrors)
+GOOGLE_API_ERRORS = (HttpError, RefreshError, TransportError, HttpLib2Error, OSError)
+
+class SyncTokenExpiredError(Exception):
+    """
+    Raised when Google rejects a stored sync token (410 Gone).
+    The caller must discard the token and run a full resync.
+    """
+    def __init__(self, message: str, calendar_id: str = 'primary'):
+        super().__init__(message)
+        self.calendar_id = calendar_id
+
+class CalendarEvent:
+    """
+    The fields of a Google Calendar event that we map onto Meeting.
+    A plain slotted record: big calendars parse thousands of these per sync, and only
+    the ones that changed are ever written (as rows, not ORM objects).
+    """
+    __slots__ = (
+        "google_event_id", "title", "start_time", "end_time", "participants",
+        "type", "summary", "ical_uid", "_content_hash"
+    )
+
+    def __init__(
+        self,
+        google_event_id: str,
+        title: str,
+        start_time: datetime,
+        end_time: datetime,
+        participants: List[str],
+        type: MeetingType,
+        summary: str,
+        ical_uid: Optional[str] = None
+    ):
+        self.google_event_id = google_event_id
+        self.title = title
+        self.start_time = start_time
+        self.end_time = end_time
+        self.participants = participants
+        self.type = type
+        self.summary = summary
+        self.ical_uid = ical_uid
+        self._content_hash = None
+
+    def __repr__(self) -> str:
+        return f"CalendarEvent({self.google_event_id!r}, {self.title!r}, {self.start_time.isoformat()})"
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Fingerprint of the fields synced onto Meeting (Google's etag also changes for
+        fields we don't store, such as reminders or colors).
+        """
+        if self._content_hash is None:
+            payload = json.dumps([
+                self.title,
+                self.start_time.isoformat(),
+                self.end_time.isoformat(),
+                self.participants,
+                self.type.value,
+                self.summary,
+            ])
+            self._content_hash = hashlib.sha1(payload.encode()).hexdigest()
+        return self._content_hash
+
+    @property
+    def dedup_key(self) -> Tuple[str, datetime]:
+        # The same meeting on several calendars shares an iCalUID; recurring
+        # instances share it too, so the start time is part of the key.
+        return (self.ical_uid or self.google_event_id, self.start_time)
+
+@dataclass
+class EventPage:
+    """
+    One page of an events listing. next_sync_token is only set on the last page.
+    """
+    events: List[CalendarEvent] = field(default_factory=list)
+    cancelled_ids: List[str] = field(default_factory=list)
+    next_sync_token: Optional[str] = None
+    is_full: bool = True
+    calendar_id: str = 'primary'
+
+def to_utc_naive(value: datetime) -> datetime:
+    """
+    Event times are tz-aware; the database stores naive UTC, like the sync window.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def get_sync_window(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Returns the (start, end) of the sync window as naive UTC datetimes.
+    """
+    now = now or datetime.utcnow()
+    # Ensure we strictly capture today's window based on UTC for consistency
+    # WIDEN THE SYNC WINDOW TO ±1 DAY UTC
+    # This handles the case where "Today" in the user's local timezone (e.g., UTC+5)
+    # corresponds to "Yesterday" or "Tomorrow" in UTC.
+    # Example: 1 AM in UTC+5 is 8 PM Previous Day in UTC.
+
+    utc_today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    utc_today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+    # Window: Yesterday 00:00 UTC to Tomorrow 23:59 UTC (3 days total coverage)
+    # This ensures we catch any meeting that could possibly be "Today" anywhere on Earth.
+    return utc_today_start - timedelta(days=1), utc_today_end + timedelta(days=1)
 
 class CalendarService:
     def __init__(self, token: str):
         # We assume the token passed is a valid access token
         # For offline access, we would need to construct Credentials with refresh_token, etc.
         self.creds = Credentials(token=token)
-        self.service = build('calendar', 'v3', credentials=self.creds)
+        self.service = GoogleClientFactory.get_service('calendar', 'v3')
+        self.http = GoogleClientFactory.authorized_http(self.creds)
 
-    def fetch_todays_meetings(self) -> List[Meeting]:
+    def fetch_todays_meetings(self) -> List[CalendarEvent]:
         """
         Fetches meetings for the current day from the primary calendar.
         """
-        now = datetime.utcnow()
-        # Ensure we strictly capture today's window based on UTC for consistency
-        # WIDEN THE SYNC WINDOW TO ±1 DAY UTC
-        # This handles the case where "Today" in the user's local timezone (e.g., UTC+5)
-        # corresponds to "Yesterday" or "Tomorrow" in UTC.
-        # Example: 1 AM in UTC+5 is 8 PM Previous Day in UTC.
-        
-        utc_today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        utc_today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Window: Yesterday 00:00 UTC to Tomorrow 23:59 UTC (3 days total coverage)
-        # This ensures we catch any meeting that could possibly be "Today" anywhere on Earth.
-        time_min = (utc_today_start - timedelta(days=1)).isoformat() + 'Z'
-        time_max = (utc_today_end + timedelta(days=1)).isoformat() + 'Z'
-        
-        print(f"DEBUG: Syncing Google Calendar. Window (UTC): {time_min} to {time_max}")
-
-        events_result = self.service.events().list(
-            calendarId='primary',
-            timeMin=time_min, 
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        print(f"DEBUG: Fetched {len(events)} raw events from Google.")
-        meetings = []
-
-        for event in events:
-            # Skip cancelled events
+        time_min, time_max = get_sync_window()
+        events = [
+            event
+            for page in self.iter_event_pages(time_min=time_min, time_max=time_max)
+            for event in page.events
+        ]
+        return sorted(events, key=lambda e: e.start_time)
+
+    def list_calendar_ids(self) -> List[str]:
+        """
+        Returns the calendars the user has selected in Google Calendar, primary first.
+        The primary calendar is always reported as 'primary'.
+        """
+        calendar_ids = ['primary']
+        page_token = None
+        while True:
+            result = self.service.calendarList().list(
+                pageToken=page_token,
+                fields='items(id,primary,selected,hidden),nextPageToken'
+            ).execute(http=self.http)
+
+            for calendar in result.get('items', []):
+                if calendar.get('primary') or calendar.get('hidden') or not calendar.get('selected'):
+                    continue
+                calendar_ids.append(calendar['id'])
+
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return calendar_ids
+
+    def watch_events(self, calendar_id: str, channel_id: str, address: str, token: str, ttl: int) -> dict:
+        """
+        Registers a push notification channel for changes to a calendar's events.
+        Returns Google's channel resource (id, resourceId, expiration in ms since epoch).
+        """
+        return self.service.events().watch(
+            calendarId=calendar_id,
+            body={
+                'id': channel_id,
+                'type': 'web_hook',
+                'address': address,
+                'token': token,
+                'params': {'ttl': str(ttl)},
+            }
+        ).execute(http=self.http)
+
+    def stop_channel(self, channel_id: str, resource_id: str):
+        self.service.channels().stop(body={'id': channel_id, 'resourceId': resource_id}).execute(http=self.http)
+
+    def iter_event_pages(
+        self,
+        time_min: Optional[datetime] = None,
+        time_max: Optional[datetime] = None,
+        sync_token: Optional[str] = None,
+        calendar_id: str = 'primary'
+    ) -> Iterator[EventPage]:
+        """
+        Lists events from a calendar, yielding one EventPage per Google result page.
+        With a sync_token only the events changed since that token was issued are returned
+        (including cancellations); otherwise the full [time_min, time_max] window is listed.
+        Raises SyncTokenExpiredError if Google no longer accepts the sync token.
+        """
+        params = self._list_params(calendar_id, sync_token, time_min, time_max)
+        page_token = None
+
+        while True:
+            try:
+                events_result = self.service.events().list(pageToken=page_token, **params).execute(http=self.http)
+            except HttpError as e:
+                self._raise_list_error(e, calendar_id, sync_token)
+
+            page = self._to_page(events_result, calendar_id, is_full=not sync_token)
+            yield page
+
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                break
+
+    def iter_calendars_event_pages(
+        self,
+        sync_tokens: Dict[str, Optional[str]],
+        time_min: Optional[datetime] = None,
+        time_max: Optional[datetime] = None
+    ) -> Iterator[EventPage]:
+        """
+        Lists events from several calendars at once, one Google batch HTTP request per round.
+        `sync_tokens` maps calendar id -> sync token (None for a full window listing).
+        Each round fetches the next page of every calendar that still has one, so the number
+        of round trips depends on the longest calendar, not on how many calendars there are.
+        Pages are yielded in the order of `sync_tokens` within each round.
+        """
+        # calendar id -> pageToken of its next page (None for the first page)
+        pending: Dict[str, Optional[str]] = {calendar_id: None for calendar_id in sync_tokens}
+
+        while pending:
+            round_ids = list(pending)[:MAX_BATCH_SIZE]
+            responses = {}
+
+            def on_response(request_id, response, exception):
+                responses[request_id] = (response, exception)
+
+            batch = GoogleClientFactory.new_batch_request('calendar', 'v3', callback=on_response)
+            for index, calendar_id in enumerate(round_ids):
+                params = self._list_params(calendar_id, sync_tokens[calendar_id], time_min, time_max)
+                batch.add(self.service.events().list(pageToken=pending[calendar_id], **params), request_id=str(index))
+            batch.execute(http=self.http)
+
+            for index, calendar_id in enumerate(round_ids):
+                events_result, exception = responses[str(index)]
+                if exception is not None:
+                    self._raise_list_error(exception, calendar_id, sync_tokens[calendar_id])
+
+                yield self._to_page(events_result, calendar_id, is_full=not sync_tokens[calendar_id])
+
+                next_page_token = events_result.get('nextPageToken')
+                if next_page_token:
+                    pending[calendar_id] = next_page_token
+                else:
+                    del pending[calendar_id]
+
+    def _list_params(
+        self,
+        calendar_id: str,
+        sync_token: Optional[str],
+        time_min: Optional[datetime],
+        time_max: Optional[datetime]
+    ) -> dict:
+        params = {'calendarId': calendar_id, 'singleEvents': True, 'maxResults': PAGE_SIZE}
+        if sync_token:
+            # timeMin/timeMax/orderBy cannot be combined with a sync token
+            params['syncToken'] = sync_token
+        else:
+            params['timeMin'] = time_min.isoformat() + 'Z'
+            params['timeMax'] = time_max.isoformat() + 'Z'
+        return params
+
+    def _raise_list_error(self, error: Exception, calendar_id: str, sync_token: Optional[str]):
+        if sync_token and isinstance(error, HttpError) and error.resp.status == 410:
+            raise SyncTokenExpiredError(str(error), calendar_id=calendar_id)
+        raise error
+
+    def _to_page(self, events_result: dict, calendar_id: str, is_full: bool) -> EventPage:
+        page = EventPage(is_full=is_full, calendar_id=calendar_id)
+        for event in events_result.get('items', []):
+            # Cancelled events only matter for incremental syncs, where they signal deletions
             if event.get('status') == 'cancelled':
+                page.cancelled_ids.append(event['id'])
                 continue
-            
-            # Additional check: sometimes 'cancelled' events don't have 'start'
-            if 'start' not in event:
-                continue
-                
-            # Parse start and end times
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            
-            # Simple logic to determine if it's an online meeting
-            # Check for hangoutLink or conferenceData or common video conference patterns in location/description
-            is_online = False
-            if 'hangoutLink' in event or 'conferenceData' in event:
-                is_online = True
-            elif event.get('location') and re.search(r'(zoom|teams|meet|webex)', event['location'], re.IGNORECASE):
-                is_online = True
-            elif event.get('description') and re.search(r'(zoom|teams|meet|webex)', event['description'], re.IGNORECASE):
-                is_online = True
-            
-            # Determine Meeting Type
-            # For now, if it's online, we assume it might be recorded or not. 
-            # The PRD says:
-            # - Online: Link detected
-            # - Offline: Physical location or no link
-            
-            meeting_type = MeetingType.ONLINE if is_online else MeetingType.OFFLINE
-            
-            # Participants
-            attendees = event.get('attendees', [])
-            participants = [a.get('email') for a in attendees if a.get('email')]
-
-            meeting = Meeting(
-                google_event_id=event['id'],
-                title=event.get('summary', 'No Title'),
-                start_time=datetime.fromisoformat(start.replace('Z', '+00:00')),
-                end_time=datetime.fromisoformat(end.replace('Z', '+00:00')),
-                participants=participants,
-                type=meeting_type,
-                summary=event.get('description', ''), # Initial summary is the description
-                user_id=0 # Placeholder, needs to be set by the caller
-            )
-            meetings.append(meeting)
-            
-        print(f"DEBUG: Parsed {len(meetings)} valid meetings.")
-        return meetings
\ No newline at end of file
+
+            record = self._parse_event(event)
+            if record:
+                page.events.append(record)
+
+        if not events_result.get('nextPageToken'):
+            page.next_sync_token = events_result.get('nextSyncToken')
+
+        return page
+
+    def _parse_event(self, event: dict) -> Optional[CalendarEvent]:
+        """
+        Maps a Google Calendar event to a CalendarEvent record.
+        """
+        # Additional check: sometimes 'cancelled' events don't have 'start'
+        if 'start' not in event:
+            return None
+
+        # Parse start and end times
+        start = event['start'].get('dateTime', event['start'].get('date'))
+        end = event['end'].get('dateTime', event['end'].get('date'))
+
+        # Determine Meeting Type
+        # The PRD says:
+        # - Online: Link detected
+        # - Offline: Physical location or no link
+        # - Unrecorded: online, but no recording/notes to expect (rules in MeetingClassifier)
+        meeting_type = MeetingClassifierFactory.get_classifier().classify(event)
+
+        # Participants
+        attendees = event.get('attendees', [])
+        participants = [a.get('email') for a in attendees if a.get('email')]
+
+        return CalendarEvent(
+            google_event_id=event['id'],
+            title=event.get('summary', 'No Title'),
+            start_time=datetime.fromisoformat(start.replace('Z', '+00:00')),
+            end_time=datetime.fromisoformat(end.replace('Z', '+00:00')),
+            participants=participants,
+            type=meeting_type,
+            summary=event.get('description', ''), # Initial summary is the description
+            ical_uid=event.get('iCalUID')
+        )
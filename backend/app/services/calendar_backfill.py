@@ -0,0 +1,224 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Deque, List, Optional, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import and_, or_, update
+import threading
+import time
+
+from ..config import settings
+from ..database import engine
+from ..models import User, CalendarBackfill
+from .calendar import CalendarService, EventPage, get_sync_window
+from .calendar_sync import CalendarSyncService
+from .google_tokens import GoogleTokenService
+from .meeting_archive import archive_horizon
+
+class BackfillError(Exception):
+    pass
+
+class RequestBudget:
+    """
+    Paces Calendar API calls to `per_second` across every thread that shares it,
+    so concurrent backfill windows stay inside the project's quota.
+    """
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+_budget = RequestBudget(settings.BACKFILL_REQUESTS_PER_SECOND)
+
+class CalendarBackfillService:
+    """
+    Imports a user's calendar over an arbitrary date range.
+
+    The range is split into BACKFILL_WINDOW_DAYS windows, each fetched as a full listing of
+    every synced calendar. Up to BACKFILL_CONCURRENCY windows are fetched in parallel (one
+    worker thread each) while the session thread applies them in order; after each window
+    the checkpoint moves past it and is committed, so a backfill that is interrupted
+    (crash, deploy, Google error) resumes from the first window it had not finished.
+
+    Ranges end before the live sync window: importing a window deletes the meetings in it
+    that Google didn't return, which would race the live sync over the same days.
+    """
+    def __init__(self, session: Session):
+        self.session = session
+
+    def create(self, user: User, start_date: date, end_date: date, window_days: Optional[int] = None) -> CalendarBackfill:
+        if end_date < start_date:
+            raise BackfillError("end_date must not be before start_date")
+        if (end_date - start_date).days + 1 > settings.BACKFILL_MAX_DAYS:
+            raise BackfillError(f"Backfills are limited to {settings.BACKFILL_MAX_DAYS} days")
+        live_start = get_sync_window()[0].date()
+        if end_date >= live_start:
+            # The live sync owns these days
+            end_date = live_start - timedelta(days=1)
+            if end_date < start_date:
+                raise BackfillError(f"Meetings from {live_start} on are kept up to date by the calendar sync; backfill earlier days")
+        horizon = archive_horizon()
+        if horizon and start_date < horizon.date():
+            # Archived days are read-only; importing into them would duplicate archived meetings
+            raise BackfillError(f"Meetings before {horizon.date()} are archived; start the backfill on or after that day")
+
+        backfill = CalendarBackfill(
+            user_id=user.id,
+            range_start=datetime.combine(start_date, dt_time.min),
+            range_end=datetime.combine(end_date, dt_time.max),
+            window_days=max(1, window_days or settings.BACKFILL_WINDOW_DAYS)
+        )
+        self.session.add(backfill)
+        self.session.commit()
+        self.session.refresh(backfill)
+        return backfill
+
+    def claim(self, backfill_id: int) -> bool:
+        """
+        Marks a backfill as running unless another worker is already making progress on it.
+        A running backfill without progress for BACKFILL_STALE_AFTER seconds can be taken over.
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.BACKFILL_STALE_AFTER)
+        claimed = self.session.execute(
+            update(CalendarBackfill).where(
+                CalendarBackfill.id == backfill_id,
+                or_(
+                    CalendarBackfill.status.in_(["pending", "failed"]),
+                    and_(CalendarBackfill.status == "running", CalendarBackfill.updated_at < stale_before)
+                )
+            ).values(status="running", error=None, updated_at=now)
+        ).rowcount == 1
+        self.session.commit()
+        return claimed
+
+    def run(self, backfill: CalendarBackfill) -> CalendarBackfill:
+        """
+        Imports the remaining windows of a claimed backfill.
+        """
+        user = self.session.get(User, backfill.user_id)
+        sync_service = CalendarSyncService(self.session)
+        windows = self._remaining_windows(backfill)
+        print(f"--- [BACKFILL] #{backfill.id} for user {backfill.user_id}: {len(windows)} windows left ---")
+
+        try:
+            access_token = self._access_token(user)
+            calendar_ids = CalendarService(token=access_token).list_calendar_ids()
+
+            with ThreadPoolExecutor(max_workers=settings.BACKFILL_CONCURRENCY) as pool:
+                in_flight: Deque[Tuple[Tuple[datetime, datetime], Future]] = deque()
+                next_window = 0
+                while in_flight or next_window < len(windows):
+                    while next_window < len(windows) and len(in_flight) < settings.BACKFILL_CONCURRENCY:
+                        window = windows[next_window]
+                        # Cached on the user, so this only hits Google when the token is about to expire
+                        access_token = self._access_token(user)
+                        in_flight.append((window, pool.submit(self._fetch_window, access_token, calendar_ids, window)))
+                        next_window += 1
+
+                    (time_min, time_max), future = in_flight.popleft()
+                    try:
+                        pages = future.result()
+                    except Exception:
+                        for _, pending in in_flight:
+                            pending.cancel()
+                        raise
+
+                    result = sync_service.import_window(user, pages, time_min, time_max)
+                    backfill.inserted += result.inserted
+                    backfill.updated += result.updated
+                    backfill.unchanged += result.unchanged
+                    backfill.deleted += result.deleted
+                    backfill.checkpoint = time_max
+                    backfill.updated_at = datetime.utcnow()
+                    self.session.add(backfill)
+                    self.session.commit()
+        except Exception as e:
+            print(f"--- [BACKFILL] #{backfill.id} stopped at {backfill.checkpoint}: {e} ---")
+            self.session.rollback()
+            backfill.status = "failed"
+            backfill.error = str(e)
+        else:
+            backfill.status = "completed"
+
+        backfill.updated_at = datetime.utcnow()
+        self.session.add(backfill)
+        self.session.commit()
+        self.session.refresh(backfill)
+        return backfill
+
+    def _access_token(self, user: User) -> str:
+        access_token = GoogleTokenService(self.session).get_access_token(user)
+        if not access_token:
+            raise BackfillError("User has not granted offline Google access")
+        return access_token
+
+    @staticmethod
+    def _remaining_windows(backfill: CalendarBackfill) -> List[Tuple[datetime, datetime]]:
+        windows = []
+        # Backfills created before ranges were cut at the live sync window
+        range_end = min(backfill.range_end, get_sync_window()[0] - timedelta(microseconds=1))
+        start = backfill.checkpoint + timedelta(microseconds=1) if backfill.checkpoint else backfill.range_start
+        while start <= range_end:
+            end = min(start + timedelta(days=backfill.window_days) - timedelta(microseconds=1), range_end)
+            windows.append((start, end))
+            start = end + timedelta(microseconds=1)
+        return windows
+
+    @staticmethod
+    def _fetch_window(access_token: str, calendar_ids: List[str], window: Tuple[datetime, datetime]) -> List[EventPage]:
+        """
+        Runs in a worker thread: lists one window of every calendar.
+        Each result page is one events.list call and is paced through the shared budget.
+        """
+        time_min, time_max = window
+        # Built in this thread so it uses this thread's HTTP transport
+        calendar_service = CalendarService(token=access_token)
+        pages = calendar_service.iter_calendars_event_pages(
+            {calendar_id: None for calendar_id in calendar_ids}, time_min=time_min, time_max=time_max
+        )
+        fetched = []
+        while True:
+            _budget.acquire()
+            page = next(pages, None)
+            if page is None:
+                return fetched
+            fetched.append(page)
+
+def run_backfill(backfill_id: int) -> Optional[CalendarBackfill]:
+    """
+    Claims and runs one backfill with its own session (background task or scheduler job).
+    Returns None if another worker is already running it.
+    """
+    with Session(engine) as session:
+        service = CalendarBackfillService(session)
+        if not service.claim(backfill_id):
+            return None
+        return service.run(session.get(CalendarBackfill, backfill_id))
+
+def resume_stalled_backfills():
+    """
+    Job to resume backfills that never started or whose worker stopped making progress.
+    Failed backfills are left for the user to resume, so a revoked grant isn't retried forever.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.BACKFILL_STALE_AFTER)
+    with Session(engine) as session:
+        backfill_ids = session.exec(
+            select(CalendarBackfill.id).where(
+                or_(
+                    and_(CalendarBackfill.status == "pending", CalendarBackfill.created_at < stale_before),
+                    and_(CalendarBackfill.status == "running", CalendarBackfill.updated_at < stale_before)
+                )
+            )
+        ).all()
+
+    for backfill_id in backfill_ids:
+        run_backfill(backfill_id)
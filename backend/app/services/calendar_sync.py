@@ -0,0 +1,472 @@
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from sqlmodel import Session, select
+from sqlalchemy import delete, func, insert, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..database import run_write
+from ..models import User, Meeting, ActionItem, CalendarSyncState, MeetingParticipant, MeetingContent, MeetingSource, ContentKind
+from .calendar import CalendarService, CalendarEvent, EventPage, SyncTokenExpiredError, get_sync_window, to_utc_naive
+from .calendar_watch import CalendarWatchService
+from .daily_dashboards import refresh_daily_dashboards
+from .dashboard_cache import dashboard_cache
+from .participant_index import participant_rows, replace_participants
+from .meeting_content import content_row, is_truncated, store_content, summary_preview
+
+# Rows per INSERT ... VALUES statement; keeps SQLite under its bound-parameter limit
+UPSERT_BATCH_SIZE = 100
+
+# Columns the calendar owns; everything else on Meeting (action items, AI summary) is ours
+SYNCED_COLUMNS = ("title", "start_time", "end_time", "participants", "type", "summary", "content_hash", "ical_uid")
+
+@dataclass
+class SyncResult:
+    mode: str  # "full" or "incremental"
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    calendar_ids: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+class StoredMeeting(NamedTuple):
+    id: int
+    google_event_id: str # the meeting's key: the id of the copy it was first synced from
+    content_hash: Optional[str]
+    start_time: datetime
+
+@dataclass
+class _SyncRun:
+    """
+    What a sync keeps across its pages: ids and keys only, for de-duplication and to find
+    orphans after a full listing.
+    """
+    result: SyncResult
+    merged_into: Dict[Tuple[str, datetime], str] = field(default_factory=dict) # event dedup key -> key of its meeting
+    seen_meetings: Set[str] = field(default_factory=set) # keys of the meetings events were merged into
+    seen_copies: Set[Tuple[str, str]] = field(default_factory=set) # (calendar id, event id) of every event listed
+    # Meetings a calendar dropped; deleted at the end unless a copy is left on another calendar
+    dropped: Set[int] = field(default_factory=set)
+    # Days whose DailyDashboard snapshot must be recomputed (old and new day of moved meetings)
+    touched_days: Set[date] = field(default_factory=set)
+    sync_tokens: Dict[str, str] = field(default_factory=dict) # calendar id -> nextSyncToken
+
+def _same_start(meeting: StoredMeeting, event: CalendarEvent) -> bool:
+    # Stored start times are naive UTC; rows written before that hold the wall-clock time
+    return meeting.start_time in (to_utc_naive(event.start_time), event.start_time.replace(tzinfo=None))
+
+class CalendarSyncService:
+    """
+    Keeps a user's local Meeting rows in step with Google Calendar.
+
+    Every calendar the user has selected in Google Calendar is synced; their events are
+    fetched together with Google batch requests and merged into one meeting per event
+    (copies on several calendars share an id, or an iCalUID and start time). Which calendar
+    events a meeting came from is kept in MeetingSource: a meeting is only deleted once no
+    calendar has a copy any more, and a changed copy updates the meeting it was merged into.
+
+    The first sync of a window lists every event in it and stores each calendar's
+    nextSyncToken. Later syncs of the same window only fetch what changed since those
+    tokens; a new day (new window), a calendar added to or removed from the set or an
+    expired token (410 Gone) falls back to a full resync of all of them.
+
+    Events are applied one result page at a time, so memory stays bounded by the page size.
+    Each page is written as one small transaction through run_write (the writer thread on
+    SQLite), so no write lock is held while the next page is fetched from Google; the
+    orphan pass and the new sync tokens are written together once every page is in. A sync
+    that fails part way keeps its old tokens, and the next one applies the changes again.
+    Writes are set-based: each page loads its existing rows with one keyed query, writes
+    changes with ON CONFLICT (user_id, google_event_id) upserts and removes cancelled
+    meetings with one DELETE for their action items and one for the meetings. Events whose
+    content hash matches the stored row are not written at all.
+
+    `session` is only read from (sync states); it is expired after a sync, since the
+    writes happen in other sessions.
+    """
+    def __init__(self, session: Session):
+        self.session = session
+
+    def sync_user(self, user: User, access_token: str, calendar_service: Optional[CalendarService] = None) -> SyncResult:
+        calendar_service = calendar_service or CalendarService(token=access_token)
+        user_id = user.id
+        time_min, time_max = get_sync_window()
+        calendar_ids = calendar_service.list_calendar_ids()
+        states, removed_states = self._get_states(user_id, calendar_ids)
+
+        run = None
+        # Meetings only a removed calendar had are found by a full listing (as orphans)
+        if not removed_states and all(
+            state.sync_token and state.window_start == time_min and state.window_end == time_max
+            for state in states.values()
+        ):
+            try:
+                run = self._apply_pages(
+                    user_id,
+                    calendar_service.iter_calendars_event_pages(
+                        {calendar_id: states[calendar_id].sync_token for calendar_id in calendar_ids}
+                    ),
+                    time_min, time_max
+                )
+            except SyncTokenExpiredError as e:
+                print(f"DEBUG: Sync token for '{e.calendar_id}' expired for user {user_id}, falling back to full resync.")
+
+        if run is None:
+            run = self._apply_pages(
+                user_id,
+                calendar_service.iter_calendars_event_pages(
+                    {calendar_id: None for calendar_id in calendar_ids}, time_min=time_min, time_max=time_max
+                ),
+                time_min, time_max
+            )
+
+        watch_service = CalendarWatchService(self.session)
+        for state in removed_states:
+            watch_service.stop_remote(state, calendar_service)
+
+        def finish(session: Session):
+            self._finish(session, user_id, run, time_min, time_max)
+            self._save_states(session, user_id, calendar_ids, run.sync_tokens, time_min, time_max)
+
+        run_write(finish)
+        self.session.expire_all()
+        dashboard_cache.invalidate(user_id)
+        run.result.calendar_ids = calendar_ids
+        return run.result
+
+    def import_window(self, user: User, pages: Iterable[EventPage], time_min: datetime, time_max: datetime) -> SyncResult:
+        """
+        Applies a full listing of [time_min, time_max] that is outside the live sync window
+        (historical backfill). Sync tokens are ignored and the window's orphans are removed.
+        """
+        user_id = user.id
+        run = self._apply_pages(user_id, pages, time_min, time_max)
+        run_write(lambda session: self._finish(session, user_id, run, time_min, time_max))
+        self.session.expire_all()
+        dashboard_cache.invalidate(user_id)
+        return run.result
+
+    def _apply_pages(self, user_id: int, pages: Iterable[EventPage], time_min: datetime, time_max: datetime) -> _SyncRun:
+        run = None
+        for page in pages:
+            if run is None:
+                run = _SyncRun(result=SyncResult(mode="full" if page.is_full else "incremental"))
+            run_write(lambda session: self._apply_page(session, user_id, page, run, time_min, time_max))
+        return run
+
+    def _apply_page(self, session: Session, user_id: int, page: EventPage, run: _SyncRun, time_min: datetime, time_max: datetime):
+        result = run.result
+        events = []
+        removed_ids = set(page.cancelled_ids)
+        for event in page.events:
+            if not page.is_full and not (time_min <= to_utc_naive(event.start_time) <= time_max):
+                # The event moved out of the synced window; treat it like a cancellation
+                removed_ids.add(event.google_event_id)
+            else:
+                events.append(event)
+        removed_ids = {g for g in removed_ids if (page.calendar_id, g) not in run.seen_copies}
+
+        sources, copies = self._load_copies(session, user_id, page.calendar_id, {e.google_event_id for e in events} | removed_ids)
+        # Copies of stored meetings with an event id of their own, new on this calendar
+        by_uid = self._load_by_ical_uid(session, user_id, {
+            e.ical_uid for e in events
+            if e.ical_uid and e.google_event_id not in copies and e.dedup_key not in run.merged_into
+        })
+
+        to_write: List[Tuple[str, CalendarEvent]] = []
+        existing: Dict[str, StoredMeeting] = {}
+        new_copies: List[Tuple[str, str]] = [] # (event id, meeting key) without a MeetingSource row yet
+        for event in events:
+            current = copies.get(event.google_event_id)
+            if current is None and event.dedup_key not in run.merged_into:
+                current = next((m for m in by_uid.get(event.ical_uid, []) if _same_start(m, event)), None)
+            key = current.google_event_id if current else run.merged_into.get(event.dedup_key, event.google_event_id)
+            run.merged_into.setdefault(event.dedup_key, key)
+            run.seen_copies.add((page.calendar_id, event.google_event_id))
+            if event.google_event_id not in sources:
+                new_copies.append((event.google_event_id, key))
+            if key in run.seen_meetings:
+                # Already taken from an earlier calendar's copy (primary wins)
+                continue
+            run.seen_meetings.add(key)
+
+            if current is None:
+                result.inserted += 1
+            elif current.content_hash != event.content_hash:
+                result.updated += 1
+                existing[key] = current
+                run.touched_days.add(current.start_time.date())
+            else:
+                result.unchanged += 1
+                continue
+            to_write.append((key, event))
+            run.touched_days.add(to_utc_naive(event.start_time).date())
+
+        self._upsert_meetings(session, user_id, to_write, existing)
+        self._write_meeting_details(session, user_id, to_write)
+        self._write_sources(session, user_id, page.calendar_id, new_copies)
+
+        if removed_ids:
+            session.execute(delete(MeetingSource).where(
+                MeetingSource.user_id == user_id,
+                MeetingSource.calendar_id == page.calendar_id,
+                MeetingSource.google_event_id.in_(removed_ids)
+            ))
+            run.dropped.update(copies[g].id for g in removed_ids if g in copies)
+
+        if page.next_sync_token:
+            run.sync_tokens[page.calendar_id] = page.next_sync_token
+
+    def _finish(self, session: Session, user_id: int, run: _SyncRun, time_min: datetime, time_max: datetime):
+        """
+        Deletes the meetings no calendar has any more and refreshes the touched days.
+        """
+        result = run.result
+        # Dropped meetings that no calendar has a copy of any more
+        gone = session.exec(
+            select(Meeting.id, Meeting.start_time).where(
+                Meeting.id.in_(run.dropped),
+                Meeting.id.not_in(select(MeetingSource.meeting_id).where(MeetingSource.meeting_id.in_(run.dropped)))
+            )
+        ).all() if run.dropped else []
+        result.deleted += self._delete_meetings(session, [meeting_id for meeting_id, _ in gone])
+        run.touched_days.update(start_time.date() for _, start_time in gone)
+
+        if result.mode == "full":
+            # Local meetings in the window that Google no longer returns
+            statement = select(Meeting.google_event_id, Meeting.id, Meeting.start_time).where(
+                Meeting.user_id == user_id,
+                Meeting.start_time >= time_min,
+                Meeting.start_time <= time_max,
+                Meeting.google_event_id != None # Only consider synced meetings
+            )
+            orphans = [
+                (meeting_id, start_time) for google_id, meeting_id, start_time in session.exec(statement).all()
+                if google_id not in run.seen_meetings
+            ]
+            result.deleted += self._delete_meetings(session, [meeting_id for meeting_id, _ in orphans])
+            run.touched_days.update(start_time.date() for _, start_time in orphans)
+
+            # Copies that are gone from their calendar while the meeting is still on another one
+            statement = select(MeetingSource.calendar_id, MeetingSource.google_event_id).join(
+                Meeting, Meeting.id == MeetingSource.meeting_id
+            ).where(
+                MeetingSource.user_id == user_id,
+                Meeting.start_time >= time_min,
+                Meeting.start_time <= time_max
+            )
+            stale = [tuple(copy) for copy in session.exec(statement).all() if tuple(copy) not in run.seen_copies]
+            for i in range(0, len(stale), UPSERT_BATCH_SIZE):
+                session.execute(delete(MeetingSource).where(
+                    MeetingSource.user_id == user_id,
+                    tuple_(MeetingSource.calendar_id, MeetingSource.google_event_id).in_(stale[i:i + UPSERT_BATCH_SIZE])
+                ))
+
+        refresh_daily_dashboards(session, user_id, run.touched_days)
+
+    def _get_states(self, user_id: int, calendar_ids: List[str]) -> Tuple[Dict[str, CalendarSyncState], List[CalendarSyncState]]:
+        """
+        The sync states of `calendar_ids` (new ones for calendars not synced before), and
+        the user's states for calendars that are no longer synced.
+        """
+        statement = select(CalendarSyncState).where(CalendarSyncState.user_id == user_id)
+        states, removed = {}, []
+        for state in self.session.exec(statement).all():
+            if state.calendar_id in calendar_ids:
+                states[state.calendar_id] = state
+            else:
+                removed.append(state)
+        for calendar_id in calendar_ids:
+            if calendar_id not in states:
+                states[calendar_id] = CalendarSyncState(user_id=user_id, calendar_id=calendar_id)
+        return states, removed
+
+    @staticmethod
+    def _save_states(
+        session: Session,
+        user_id: int,
+        calendar_ids: List[str],
+        sync_tokens: Dict[str, str],
+        time_min: datetime,
+        time_max: datetime
+    ):
+        """
+        Stores the window and new sync tokens of the synced calendars and deletes the
+        states of calendars that are no longer synced.
+        """
+        states = {
+            state.calendar_id: state
+            for state in session.exec(select(CalendarSyncState).where(CalendarSyncState.user_id == user_id)).all()
+        }
+        synced_at = datetime.utcnow()
+        for calendar_id in calendar_ids:
+            state = states.pop(calendar_id, None) or CalendarSyncState(user_id=user_id, calendar_id=calendar_id)
+            if calendar_id in sync_tokens:
+                state.sync_token = sync_tokens[calendar_id]
+            state.window_start = time_min
+            state.window_end = time_max
+            state.synced_at = synced_at
+            session.add(state)
+        for state in states.values():
+            session.delete(state)
+
+    @staticmethod
+    def _load_existing(session: Session, user_id: int, google_ids: Set[str]) -> Dict[str, StoredMeeting]:
+        """
+        Maps meeting key (google_event_id) -> StoredMeeting for the given keys in one round trip.
+        """
+        if not google_ids:
+            return {}
+        statement = select(Meeting.id, Meeting.google_event_id, Meeting.content_hash, Meeting.start_time).where(
+            Meeting.user_id == user_id,
+            Meeting.google_event_id.in_(google_ids)
+        )
+        return {row[1]: StoredMeeting(*row) for row in session.exec(statement).all()}
+
+    def _load_copies(self, session: Session, user_id: int, calendar_id: str, event_ids: Set[str]) -> Tuple[Set[str], Dict[str, StoredMeeting]]:
+        """
+        For events of one calendar, returns (the event ids that have a MeetingSource row,
+        event id -> the stored meeting it is a copy of). A meeting is found through the
+        calendar's MeetingSource rows, or else by being keyed by the same event id.
+        """
+        if not event_ids:
+            return set(), {}
+        statement = select(MeetingSource.google_event_id, Meeting.id, Meeting.google_event_id, Meeting.content_hash, Meeting.start_time).join(
+            Meeting, Meeting.id == MeetingSource.meeting_id
+        ).where(
+            MeetingSource.user_id == user_id,
+            MeetingSource.calendar_id == calendar_id,
+            MeetingSource.google_event_id.in_(event_ids)
+        )
+        copies = {row[0]: StoredMeeting(*row[1:]) for row in session.exec(statement).all()}
+        sources = set(copies)
+        for google_id, meeting in self._load_existing(session, user_id, event_ids - copies.keys()).items():
+            copies[google_id] = meeting
+        return sources, copies
+
+    @staticmethod
+    def _load_by_ical_uid(session: Session, user_id: int, ical_uids: Set[str]) -> Dict[str, List[StoredMeeting]]:
+        """
+        Maps iCalUID -> StoredMeeting for the user's meetings with these iCalUIDs (one per
+        instance of a recurring event).
+        """
+        if not ical_uids:
+            return {}
+        statement = select(Meeting.ical_uid, Meeting.id, Meeting.google_event_id, Meeting.content_hash, Meeting.start_time).where(
+            Meeting.user_id == user_id,
+            Meeting.ical_uid.in_(ical_uids)
+        )
+        meetings: Dict[str, List[StoredMeeting]] = {}
+        for row in session.exec(statement).all():
+            meetings.setdefault(row[0], []).append(StoredMeeting(*row[1:]))
+        return meetings
+
+    def _upsert_meetings(self, session: Session, user_id: int, events: List[Tuple[str, CalendarEvent]], existing: Dict[str, StoredMeeting]) -> int:
+        """
+        Writes (meeting key, event) pairs: an event updates the meeting with that key, or inserts it.
+        """
+        if not events:
+            return 0
+
+        rows = [self._to_row(user_id, key, event) for key, event in events]
+        dialect = session.get_bind().dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            return self._write_meetings_portable(session, rows, existing)
+
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+            statement = insert_fn(Meeting).values(rows[i:i + UPSERT_BATCH_SIZE])
+            excluded = statement.excluded
+            set_ = {column: getattr(excluded, column) for column in SYNCED_COLUMNS}
+            # Keep the AI summary when the event has no description of its own
+            set_["summary"] = func.coalesce(func.nullif(excluded.summary, ""), Meeting.summary)
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id", "google_event_id"],
+                set_=set_
+            )
+            session.execute(statement)
+        return len(rows)
+
+    @staticmethod
+    def _write_meetings_portable(session: Session, rows: List[dict], existing: Dict[str, StoredMeeting]) -> int:
+        """
+        Bulk insert/update for databases without ON CONFLICT support.
+        """
+        updates, inserts = [], []
+        for row in rows:
+            current = existing.get(row["google_event_id"])
+            if current:
+                row = dict(row, id=current.id)
+                if not row["summary"]:
+                    del row["summary"]
+                updates.append(row)
+            else:
+                inserts.append(row)
+
+        if updates:
+            session.execute(update(Meeting), updates)
+        if inserts:
+            session.execute(insert(Meeting), inserts)
+        return len(rows)
+
+    @staticmethod
+    def _delete_meetings(session: Session, meeting_ids: List[int]) -> int:
+        if not meeting_ids:
+            return 0
+        print(f"DEBUG: Deleting {len(meeting_ids)} orphan meetings: {meeting_ids}")
+        # Action items, participants, sources and content have no DB-level cascade, so remove them with the meetings
+        session.execute(delete(ActionItem).where(ActionItem.meeting_id.in_(meeting_ids)))
+        session.execute(delete(MeetingParticipant).where(MeetingParticipant.meeting_id.in_(meeting_ids)))
+        session.execute(delete(MeetingSource).where(MeetingSource.meeting_id.in_(meeting_ids)))
+        session.execute(delete(MeetingContent).where(MeetingContent.meeting_id.in_(meeting_ids)))
+        session.execute(delete(Meeting).where(Meeting.id.in_(meeting_ids)))
+        return len(meeting_ids)
+
+    def _write_meeting_details(self, session: Session, user_id: int, events: List[Tuple[str, CalendarEvent]]):
+        """
+        Rewrites the MeetingParticipant rows of the meetings just written and stores the
+        full text of descriptions too long for Meeting.summary.
+        """
+        if not events:
+            return
+        # New meetings only have ids once upserted, so look them all up in one query
+        meetings = self._load_existing(session, user_id, {key for key, _ in events})
+        rows, contents = [], []
+        for key, event in events:
+            meeting_id = meetings[key].id
+            rows += participant_rows(meeting_id, user_id, event.start_time, event.participants)
+            if is_truncated(event.summary):
+                contents.append(content_row(meeting_id, ContentKind.DESCRIPTION, event.summary))
+        replace_participants(session, [meeting.id for meeting in meetings.values()], rows)
+        store_content(session, contents)
+
+    def _write_sources(self, session: Session, user_id: int, calendar_id: str, copies: List[Tuple[str, str]]):
+        """
+        Adds the MeetingSource rows of (event id, meeting key) copies of one calendar.
+        """
+        if not copies:
+            return
+        meetings = self._load_existing(session, user_id, {key for _, key in copies})
+        rows = [
+            {"user_id": user_id, "calendar_id": calendar_id, "google_event_id": event_id, "meeting_id": meetings[key].id}
+            for event_id, key in copies
+        ]
+        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+            session.execute(insert(MeetingSource), rows[i:i + UPSERT_BATCH_SIZE])
+
+    @staticmethod
+    def _to_row(user_id: int, key: str, event: CalendarEvent) -> dict:
+        row = {column: getattr(event, column) for column in SYNCED_COLUMNS}
+        # The full description goes to MeetingContent (see _write_meeting_details)
+        row["summary"] = summary_preview(event.summary)
+        row["start_time"] = to_utc_naive(event.start_time)
+        row["end_time"] = to_utc_naive(event.end_time)
+        row["user_id"] = user_id
+        row["google_event_id"] = key
+        return row
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlmodel import Session, select
+import secrets
+import uuid
+
+from ..config import settings
+from ..models import User, CalendarSyncState
+from .calendar import CalendarService
+
+class CalendarWatchService:
+    """
+    Manages Google Calendar push notification channels (events.watch), one per synced calendar.
+
+    Google POSTs to CALENDAR_WEBHOOK_URL whenever a watched calendar changes; the webhook
+    then runs a delta sync for just that user. Channels expire (Google caps them at about a
+    week), so they are renewed once they are within WATCH_CHANNEL_RENEW_MARGIN of expiry.
+    """
+    def __init__(self, session: Session):
+        self.session = session
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(settings.CALENDAR_WEBHOOK_URL)
+
+    def ensure_channels(self, user: User, calendar_service: CalendarService, calendar_ids: List[str]) -> int:
+        """
+        Registers or renews channels for every calendar the user syncs, and stops channels
+        for calendars that are no longer synced. Returns the number of channels (re)registered.
+        """
+        if not self.is_enabled():
+            return 0
+
+        states = self.session.exec(
+            select(CalendarSyncState).where(CalendarSyncState.user_id == user.id)
+        ).all()
+        calendar_ids = set(calendar_ids)
+        renew_before = datetime.utcnow() + timedelta(seconds=settings.WATCH_CHANNEL_RENEW_MARGIN)
+
+        registered = 0
+        for state in states:
+            if state.calendar_id not in calendar_ids:
+                self.stop_channel(state, calendar_service)
+                continue
+            if state.channel_id and state.channel_expiration and state.channel_expiration > renew_before:
+                continue
+
+            old_channel = (state.channel_id, state.channel_resource_id)
+            channel_id = str(uuid.uuid4())
+            channel_token = secrets.token_urlsafe(32)
+            try:
+                channel = calendar_service.watch_events(
+                    state.calendar_id, channel_id, settings.CALENDAR_WEBHOOK_URL, channel_token, settings.WATCH_CHANNEL_TTL
+                )
+            except Exception as e:
+                print(f"--- [WATCH] Could not watch '{state.calendar_id}' for user {user.id}: {e} ---")
+                continue
+
+            state.channel_id = channel_id
+            state.channel_token = channel_token
+            state.channel_resource_id = channel.get("resourceId")
+            expiration_ms = channel.get("expiration")
+            state.channel_expiration = (
+                datetime.utcfromtimestamp(int(expiration_ms) / 1000) if expiration_ms
+                else datetime.utcnow() + timedelta(seconds=settings.WATCH_CHANNEL_TTL)
+            )
+            self.session.add(state)
+            registered += 1
+
+            # Stop the channel being replaced so Google doesn't notify twice until it expires
+            if old_channel[0] and old_channel[1]:
+                self._stop_remote(old_channel[0], old_channel[1], calendar_service)
+
+        self.session.commit()
+        return registered
+
+    def has_active_channels(self, user: User, calendar_ids: List[str]) -> bool:
+        """
+        True if every one of the given calendars is covered by a live channel.
+        """
+        states = self.session.exec(
+            select(CalendarSyncState).where(
+                CalendarSyncState.user_id == user.id,
+                CalendarSyncState.calendar_id.in_(calendar_ids)
+            )
+        ).all()
+        now = datetime.utcnow()
+        return len(states) == len(set(calendar_ids)) and all(
+            state.channel_id and state.channel_expiration and state.channel_expiration > now
+            for state in states
+        )
+
+    def find_channel(self, channel_id: str, channel_token: Optional[str]) -> Optional[CalendarSyncState]:
+        """
+        Looks up the calendar a notification belongs to. Returns None for unknown
+        channels or when the channel token doesn't match.
+        """
+        state = self.session.exec(
+            select(CalendarSyncState).where(CalendarSyncState.channel_id == channel_id)
+        ).first()
+        if not state or not channel_token or not secrets.compare_digest(state.channel_token or "", channel_token):
+            return None
+        return state
+
+    def stop_channel(self, state: CalendarSyncState, calendar_service: CalendarService):
+        """
+        Stops the calendar's channel, if it has one, and clears it from the state.
+        """
+        self.stop_remote(state, calendar_service)
+        state.channel_id = None
+        state.channel_resource_id = None
+        state.channel_token = None
+        state.channel_expiration = None
+        self.session.add(state)
+
+    def stop_remote(self, state: CalendarSyncState, calendar_service: CalendarService):
+        """
+        Stops the calendar's channel at Google, if it has one, leaving the state as it is
+        (for callers that delete the state in another session).
+        """
+        if state.channel_id and state.channel_resource_id:
+            self._stop_remote(state.channel_id, state.channel_resource_id, calendar_service)
+
+    def _stop_remote(self, channel_id: str, resource_id: str, calendar_service: CalendarService):
+        try:
+            calendar_service.stop_channel(channel_id, resource_id)
+        except Exception as e:
+            # Channels expire on their own; a failed stop only means a few extra notifications
+            print(f"--- [WATCH] Could not stop channel {channel_id}: {e} ---")
@@ -0,0 +1,89 @@
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Iterable, Optional
+from sqlmodel import Session
+from sqlalchemy import Date, and_, delete, func, insert, literal, select, union_all
+
+from ..database import engine
+from ..models import Meeting, MeetingArchive, DailyDashboard
+
+# DailyDashboard rows are derived from the meetings of a (user, UTC day) and their action
+# counters (services/action_counters.py). A change to a day's meetings or action items
+# recomputes just that day's row, in the same transaction: its row is deleted and, if the
+# day still has meetings, re-inserted from one grouped query over the day's meetings.
+# Archived days (services/meeting_archive.py) no longer change; only a rebuild reads them.
+
+def _meeting_day(source=Meeting.__table__):
+    # DATE() works on both SQLite (ISO text timestamps) and Postgres
+    return func.date(source.c.start_time, type_=Date)
+
+def _snapshot_select(source, condition):
+    day = _meeting_day(source)
+    open_actions = func.coalesce(func.sum(source.c.open_action_count), 0)
+    return select(
+        source.c.user_id,
+        day,
+        func.count(source.c.id),
+        open_actions,
+        func.coalesce(func.sum(source.c.total_action_count), 0),
+        open_actions == 0,
+        literal(datetime.utcnow())
+    ).where(condition).group_by(source.c.user_id, day)
+
+def _insert_snapshots(source, condition):
+    return insert(DailyDashboard).from_select(
+        ["user_id", "day", "meeting_count", "open_action_count", "total_action_count", "is_resolved", "updated_at"],
+        _snapshot_select(source, condition)
+    )
+
+def snapshot_statements(user_id: int, days: Iterable[date]) -> list:
+    """
+    Statements that recompute the user's DailyDashboard rows for `days`.
+    """
+    days = sorted(set(days))
+    if not days:
+        return []
+    in_days = and_(
+        Meeting.user_id == user_id,
+        # The start_time range lets the (user_id, start_time) index narrow the scan
+        Meeting.start_time >= datetime.combine(days[0], dt_time.min),
+        Meeting.start_time < datetime.combine(days[-1] + timedelta(days=1), dt_time.min),
+        _meeting_day().in_(days)
+    )
+    return [
+        delete(DailyDashboard).where(
+            DailyDashboard.user_id == user_id, DailyDashboard.day.in_(days)
+        ).execution_options(synchronize_session=False),
+        _insert_snapshots(Meeting.__table__, in_days),
+    ]
+
+def refresh_daily_dashboards(session: Session, user_id: int, days: Iterable[date]):
+    for statement in snapshot_statements(user_id, days):
+        session.execute(statement)
+
+def rebuild_statements(user_id: Optional[int] = None) -> list:
+    """
+    Statements that recompute every DailyDashboard row (live and archived meetings), of one user or of everyone.
+    """
+    columns = ("id", "user_id", "start_time", "open_action_count", "total_action_count")
+    meetings = union_all(
+        select(*[getattr(Meeting, column) for column in columns]),
+        select(*[getattr(MeetingArchive, column) for column in columns])
+    ).subquery("meetings")
+
+    if user_id is None:
+        return [delete(DailyDashboard), _insert_snapshots(meetings, meetings.c.id != None)]
+    return [
+        delete(DailyDashboard).where(DailyDashboard.user_id == user_id),
+        _insert_snapshots(meetings, meetings.c.user_id == user_id),
+    ]
+
+def rebuild_daily_dashboards(user_id: Optional[int] = None) -> int:
+    """
+    Backfill: rebuilds the snapshots from the meetings. Returns the number of rows written.
+    """
+    with Session(engine) as session:
+        remove, rebuild = rebuild_statements(user_id)
+        session.execute(remove)
+        written = session.execute(rebuild).rowcount
+        session.commit()
+    return written
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Optional, Tuple
+import hashlib
+import itertools
+import threading
+import time
+import uuid
+
+from ..config import settings
+
+@dataclass
+class CachedResponse:
+    etag: str
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+class DashboardCache:
+    """
+    Rendered /dashboard responses per (user, request), kept for `ttl` seconds in an LRU of
+    at most `max_entries`.
+
+    Every user has a version that writers bump with invalidate() once they have committed
+    a change to the user's meetings or action items (sync, /process, /analyze, actions).
+    A response is only stored if the version didn't move while it was being computed and
+    is only served while the version is unchanged. The version is part of the ETag, so a
+    poll whose If-None-Match still matches gets a 304 straight from memory.
+
+    Kept in process memory; a write made by another process (a script) shows up once the
+    TTL runs out.
+    """
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[Tuple[int, Hashable], Tuple[str, CachedResponse]]" = OrderedDict()
+        # One entry per user who had a write since the process started; never dropped,
+        # so a version can't go back to a value an old ETag was issued for
+        self.versions: Dict[int, int] = {}
+        self.epoch = 0 # bumped by invalidate_all()
+        self.counter = itertools.count(1)
+        # ETags issued before a restart must not match the new process's versions
+        self.instance = uuid.uuid4().hex[:8]
+        self.lock = threading.Lock()
+
+    def version(self, user_id: int) -> str:
+        with self.lock:
+            return self._version(user_id)
+
+    def _version(self, user_id: int) -> str:
+        return f"{self.epoch}.{self.versions.get(user_id, 0)}"
+
+    def invalidate(self, user_id: int):
+        with self.lock:
+            self.versions[user_id] = next(self.counter)
+
+    def invalidate_all(self):
+        """
+        For jobs that change many users' meetings at once (archival, counter repair).
+        """
+        with self.lock:
+            self.epoch = next(self.counter)
+            self.entries.clear()
+
+    def get(self, user_id: int, key: Hashable) -> Optional[CachedResponse]:
+        if not self.ttl:
+            return None
+        with self.lock:
+            entry = self.entries.get((user_id, key))
+            if entry is None:
+                return None
+            version, cached = entry
+            if version != self._version(user_id) or cached.expires_at < time.monotonic():
+                del self.entries[(user_id, key)]
+                return None
+            self.entries.move_to_end((user_id, key))
+            return cached
+
+    def put(self, user_id: int, key: Hashable, version: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """
+        Stores a response computed from data read after version() returned `version`.
+        Returns it with its ETag either way.
+        """
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+        cached = CachedResponse(
+            etag=f'W/"{self.instance}-{version}-{digest}"',
+            body=body,
+            headers=headers or {},
+            expires_at=time.monotonic() + self.ttl
+        )
+        if self.ttl:
+            with self.lock:
+                # A write committed meanwhile may not be in the response
+                if version == self._version(user_id):
+                    self.entries[(user_id, key)] = (version, cached)
+                    self.entries.move_to_end((user_id, key))
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+        return cached
+
+dashboard_cache = DashboardCache(settings.DASHBOARD_CACHE_SIZE, settings.DASHBOARD_CACHE_TTL)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import Session
+import requests
+
+from ..config import settings
+from ..models import User
+from .auth_cache import invalidate_user
+
+# Refresh this many seconds before Google's expiry so a token never dies mid-sync
+TOKEN_EXPIRY_MARGIN = 120
+
+class GoogleTokenError(Exception):
+    pass
+
+class GoogleTokenService:
+    """
+    Server-side Google OAuth tokens for offline access (background sync).
+    Access tokens are cached on the user until shortly before they expire.
+    """
+    def __init__(self, session: Session):
+        self.session = session
+
+    def get_access_token(self, user: User) -> Optional[str]:
+        """
+        Returns a valid access token for the user, refreshing it if needed.
+        Returns None if the user never granted offline access.
+        """
+        if (
+            user.google_access_token
+            and user.google_token_expiry
+            and user.google_token_expiry > datetime.utcnow() + timedelta(seconds=TOKEN_EXPIRY_MARGIN)
+        ):
+            return user.google_access_token
+
+        if not user.google_refresh_token:
+            return None
+
+        return self._request_token(user, {
+            "grant_type": "refresh_token",
+            "refresh_token": user.google_refresh_token,
+        })
+
+    def exchange_code(self, user: User, code: str, redirect_uri: str) -> str:
+        """
+        Exchanges an OAuth authorization code (requested with access_type=offline)
+        for tokens and stores them on the user.
+        """
+        return self._request_token(user, {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": redirect_uri,
+        })
+
+    def _request_token(self, user: User, data: dict) -> str:
+        data = dict(data, client_id=settings.GOOGLE_CLIENT_ID, client_secret=settings.GOOGLE_CLIENT_SECRET)
+        response = requests.post(settings.GOOGLE_TOKEN_URI, data=data, timeout=30)
+
+        if response.status_code != 200:
+            error = response.json().get("error", "") if response.headers.get("content-type", "").startswith("application/json") else ""
+            if error == "invalid_grant" and data["grant_type"] == "refresh_token":
+                # Revoked or expired grant; stop trying until the user reconnects Google
+                print(f"--- [GOOGLE] Refresh token for user {user.id} was revoked ---")
+                user.google_refresh_token = None
+                user.google_access_token = None
+                self.session.add(user)
+                self.session.commit()
+                invalidate_user(user.id)
+            raise GoogleTokenError(f"Token request failed ({response.status_code}): {response.text}")
+
+        token_data = response.json()
+        user.google_access_token = token_data["access_token"]
+        user.google_token_expiry = datetime.utcnow() + timedelta(seconds=token_data.get("expires_in", 3600))
+        # Google only returns a refresh token on the first consent
+        if token_data.get("refresh_token"):
+            user.google_refresh_token = token_data["refresh_token"]
+        self.session.add(user)
+        self.session.commit()
+        invalidate_user(user.id)
+        return user.google_access_token
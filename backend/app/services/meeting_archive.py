@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlmodel import Session, select
+from sqlalchemy import Date, delete, exists, func, insert, literal, text
+
+from ..config import settings
+from ..database import engine
+from ..models import Meeting, ActionItem, MeetingArchive, ActionItemArchive, MeetingParticipant, MeetingSource, DailyDashboard
+from .dashboard_cache import dashboard_cache
+from .participant_index import participant_rows, replace_participants
+
+# Rows per IN (...) list when restoring; keeps SQLite under its bound-parameter limit
+RESTORE_BATCH_SIZE = 500
+
+# Columns copied from meeting to meetingarchive (archived_at is added on the way)
+ARCHIVED_COLUMNS = (
+    "id", "start_time", "user_id", "google_event_id", "title", "end_time", "participants",
+    "type", "summary", "content_hash", "open_action_count", "total_action_count"
+)
+ARCHIVED_ACTION_COLUMNS = ("id", "meeting_id", "description", "is_completed", "suggested_action")
+
+def archive_horizon() -> Optional[datetime]:
+    """
+    Meetings that start before this (UTC midnight) belong in the archive; None if disabled.
+    Whole days move together, so a day is either entirely live or entirely archived, and a
+    day only moves once it is resolved.
+    """
+    if not settings.ARCHIVE_AFTER_DAYS:
+        return None
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+class MeetingArchiveService:
+    """
+    Moves cold meetings out of the live `meeting`/`actionitem` tables, so the dashboard,
+    reminder and sync queries keep working on a table that only grows with recent data.
+
+    Only resolved days are archived: a day with an open action item stays live, so the item
+    can still be completed or executed and is still in the reminders. Each batch is copied
+    into meetingarchive and deleted from the live tables in one transaction. The (completed)
+    action items are compacted away: their counts stay on the archived meeting and in the
+    day's DailyDashboard row.
+    """
+    def __init__(self, session: Session):
+        self.session = session
+
+    def archive_batch(self, horizon: datetime, limit: int) -> int:
+        unresolved_day = exists().where(
+            DailyDashboard.user_id == Meeting.user_id,
+            DailyDashboard.day == func.date(Meeting.start_time, type_=Date),
+            DailyDashboard.is_resolved == False
+        )
+        meeting_ids = self.session.exec(
+            select(Meeting.id).where(
+                Meeting.start_time < horizon,
+                ~unresolved_day,
+                # Counters can drift until the nightly repair; the items themselves decide
+                Meeting.id.not_in(select(ActionItem.meeting_id).where(ActionItem.is_completed == False))
+            ).limit(limit)
+        ).all()
+        if not meeting_ids:
+            return 0
+
+        if self.session.get_bind().dialect.name == "postgresql":
+            self._ensure_partitions(meeting_ids)
+
+        self.session.execute(insert(MeetingArchive).from_select(
+            list(ARCHIVED_COLUMNS) + ["archived_at"],
+            select(*[getattr(Meeting, column) for column in ARCHIVED_COLUMNS], literal(datetime.utcnow()))
+            .where(Meeting.id.in_(meeting_ids))
+        ))
+        self.session.execute(delete(ActionItem).where(ActionItem.meeting_id.in_(meeting_ids)))
+        # The participant index and sync's calendar copies cover live meetings only
+        self.session.execute(delete(MeetingParticipant).where(MeetingParticipant.meeting_id.in_(meeting_ids)))
+        self.session.execute(delete(MeetingSource).where(MeetingSource.meeting_id.in_(meeting_ids)))
+        self.session.execute(delete(Meeting).where(Meeting.id.in_(meeting_ids)))
+        self.session.commit()
+        return len(meeting_ids)
+
+    def restore_unresolved(self) -> int:
+        """
+        Moves archived days that still have open action items back to the live tables,
+        with those items. Archival used to keep open items in actionitemarchive, where they
+        could no longer be completed. Returns the number of meetings restored. The caller commits.
+        """
+        open_days = {
+            (user_id, start_time.date()) for user_id, start_time in self.session.exec(
+                select(MeetingArchive.user_id, MeetingArchive.start_time).where(MeetingArchive.open_action_count > 0)
+            ).all()
+        }
+        meetings = self.session.exec(
+            select(MeetingArchive.id, MeetingArchive.user_id, MeetingArchive.start_time, MeetingArchive.participants).where(
+                MeetingArchive.user_id.in_({user_id for user_id, _ in open_days})
+            )
+        ).all() if open_days else []
+        meetings = [meeting for meeting in meetings if (meeting[1], meeting[2].date()) in open_days]
+        for i in range(0, len(meetings), RESTORE_BATCH_SIZE):
+            self._restore(meetings[i:i + RESTORE_BATCH_SIZE])
+        return len(meetings)
+
+    def _restore(self, meetings: List[tuple]):
+        meeting_ids = [meeting[0] for meeting in meetings]
+        self.session.execute(insert(Meeting).from_select(
+            list(ARCHIVED_COLUMNS),
+            select(*[getattr(MeetingArchive, column) for column in ARCHIVED_COLUMNS]).where(MeetingArchive.id.in_(meeting_ids))
+        ))
+        self.session.execute(insert(ActionItem).from_select(
+            list(ARCHIVED_ACTION_COLUMNS),
+            select(*[getattr(ActionItemArchive, column) for column in ARCHIVED_ACTION_COLUMNS])
+            .where(ActionItemArchive.meeting_id.in_(meeting_ids))
+        ))
+        replace_participants(self.session, [], [row for meeting in meetings for row in participant_rows(*meeting)])
+        self.session.execute(delete(ActionItemArchive).where(ActionItemArchive.meeting_id.in_(meeting_ids)))
+        self.session.execute(delete(MeetingArchive).where(MeetingArchive.id.in_(meeting_ids)))
+
+    def _ensure_partitions(self, meeting_ids: List[int]):
+        """
+        Creates the monthly meetingarchive partitions the batch will be written to.
+        """
+        months = self.session.exec(
+            select(func.date_trunc("month", Meeting.start_time)).where(Meeting.id.in_(meeting_ids)).distinct()
+        ).all()
+        for month in months:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            self.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS meetingarchive_{month:%Y%m} PARTITION OF meetingarchive "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month:%Y-%m-%d}')"
+            ))
+
+def archive_cold_meetings() -> int:
+    """
+    Job to archive every meeting older than ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE at a time.
+    Returns the number of meetings archived.
+    """
+    horizon = archive_horizon()
+    if horizon is None:
+        return 0
+
+    archived = 0
+    while True:
+        with Session(engine) as session:
+            moved = MeetingArchiveService(session).archive_batch(horizon, settings.ARCHIVE_BATCH_SIZE)
+        archived += moved
+        if moved < settings.ARCHIVE_BATCH_SIZE:
+            break
+    if archived:
+        dashboard_cache.invalidate_all()
+        print(f"--- [ARCHIVE] Archived {archived} meetings that started before {horizon.date()} ---")
+    return archived
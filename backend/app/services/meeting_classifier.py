@@ -0,0 +1,220 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+import json
+import re
+import threading
+
+from ..config import settings
+from ..models import MeetingType
+
+# Conferencing providers recognised in an event's location/description/conference data
+DEFAULT_PROVIDER_PATTERNS = ["zoom", "teams", "webex", "meet.google.com", "google meet"]
+
+# Phrases organisers use when a call must not be recorded
+DEFAULT_UNRECORDED_PATTERNS = ["do not record", "don't record", "off the record", "no recording"]
+
+# Text fields a rule can match against
+FIELDS = ("title", "location", "description", "conference", "rooms")
+
+def _split(value: str) -> List[str]:
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+class MultiPatternMatcher:
+    """
+    Finds which of many literal patterns occur in a text, in one pass.
+
+    Works like Aho-Corasick: the patterns are merged into a trie so shared prefixes are
+    matched once, and every pattern carries an output set of the shorter patterns it
+    contains. The trie is compiled to a single regex run by the C regex engine inside a
+    zero-width lookahead, so overlapping occurrences are found too. Cost per text depends
+    on the text length and trie depth, not on the number of patterns.
+    """
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted({pattern.lower() for pattern in patterns if pattern})
+        self.outputs = {
+            pattern: {other for other in self.patterns if other in pattern}
+            for pattern in self.patterns
+        }
+        self.regex = re.compile(f"(?=({self._trie_regex(self.patterns)}))", re.IGNORECASE) if self.patterns else None
+
+    def search(self, text: Optional[str]) -> Set[str]:
+        if not text or self.regex is None:
+            return set()
+        found = set()
+        for match in self.regex.finditer(text):
+            found |= self.outputs[match.group(1).lower()]
+        return found
+
+    @staticmethod
+    def _trie_regex(patterns: List[str]) -> str:
+        trie: dict = {}
+        for pattern in patterns:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        def build(node: dict) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            # A pattern ends here: the longer continuations are optional (greedy, so longest wins)
+            return f"(?:{body})?" if "" in node else body
+
+        return build(trie)
+
+@dataclass
+class ClassificationRule:
+    """
+    Assigns `meeting_type` to events matching every condition that is set.
+    Rules are evaluated in order; the first match wins.
+    """
+    name: str
+    meeting_type: MeetingType
+    patterns: List[str] = field(default_factory=list) # any of these (case-insensitive) in `fields`
+    fields: List[str] = field(default_factory=lambda: ["location", "description"])
+    online: Optional[bool] = None # only events that are (not) online
+    conference: Optional[bool] = None # only events that have (no) Google conference data
+    min_attendees: Optional[int] = None
+    max_attendees: Optional[int] = None
+
+    def __post_init__(self):
+        self.meeting_type = MeetingType(self.meeting_type)
+        self.patterns = [pattern.lower() for pattern in self.patterns]
+        unknown = set(self.fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Rule '{self.name}' uses unknown fields: {sorted(unknown)}")
+
+    def conditions_match(self, online: bool, conference: bool, attendees: int) -> bool:
+        return (
+            (self.online is None or self.online == online)
+            and (self.conference is None or self.conference == conference)
+            and (self.min_attendees is None or attendees >= self.min_attendees)
+            and (self.max_attendees is None or attendees <= self.max_attendees)
+        )
+
+class MeetingClassifier:
+    """
+    Decides Online / Offline / Unrecorded for a raw Google Calendar event.
+
+    An event is online if it has Google conference data (entry points or a hangoutLink) or
+    a provider pattern appears in its location, description or conference details. The
+    rules then refine that; events no rule matches are Online or Offline accordingly.
+
+    All patterns (providers and rules) share one MultiPatternMatcher, so each text field is
+    scanned once per event, and only rules whose patterns were found (plus pattern-less
+    rules) are checked. Hit counts per rule are kept for tuning (see stats()).
+    """
+    DEFAULT_ONLINE = "default-online"
+    DEFAULT_OFFLINE = "default-offline"
+
+    def __init__(self, rules: List[ClassificationRule], provider_patterns: List[str]):
+        self.rules = rules
+        self.provider_patterns = {pattern.lower() for pattern in provider_patterns}
+        self.matcher = MultiPatternMatcher(
+            list(self.provider_patterns) + [pattern for rule in rules for pattern in rule.patterns]
+        )
+
+        # (field, pattern) -> indexes of the rules it triggers
+        self.rules_by_hit: Dict[tuple, List[int]] = {}
+        for index, rule in enumerate(rules):
+            for field_name in rule.fields:
+                for pattern in rule.patterns:
+                    self.rules_by_hit.setdefault((field_name, pattern), []).append(index)
+        self.unconditional = [index for index, rule in enumerate(rules) if not rule.patterns]
+
+        self.hits: Dict[str, int] = {rule.name: 0 for rule in rules}
+        self.hits[self.DEFAULT_ONLINE] = 0
+        self.hits[self.DEFAULT_OFFLINE] = 0
+        self.classified = 0
+        self.lock = threading.Lock()
+
+    def classify(self, event: dict) -> MeetingType:
+        conference_data = event.get('conferenceData') or {}
+        entry_points = conference_data.get('entryPoints') or []
+        has_conference = bool(entry_points) or 'hangoutLink' in event
+
+        attendees = event.get('attendees', [])
+        rooms = [a.get('displayName') or a.get('email', '') for a in attendees if a.get('resource')]
+        attendee_count = len(attendees) - len(rooms)
+
+        texts = {
+            "title": event.get('summary'),
+            "location": event.get('location'),
+            "description": event.get('description'),
+            "conference": " ".join(
+                [(conference_data.get('conferenceSolution') or {}).get('name', ''), event.get('hangoutLink', '')]
+                + [entry.get('uri', '') for entry in entry_points]
+            ),
+            "rooms": " ".join(rooms),
+        }
+        hits = {field_name: self.matcher.search(text) for field_name, text in texts.items()}
+
+        online = has_conference or any(
+            hits[field_name] & self.provider_patterns for field_name in ("location", "description", "conference")
+        )
+
+        candidates = set(self.unconditional)
+        for field_name, patterns in hits.items():
+            for pattern in patterns:
+                candidates.update(self.rules_by_hit.get((field_name, pattern), ()))
+
+        name, meeting_type = (self.DEFAULT_ONLINE, MeetingType.ONLINE) if online else (self.DEFAULT_OFFLINE, MeetingType.OFFLINE)
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            if rule.conditions_match(online, has_conference, attendee_count):
+                name, meeting_type = rule.name, rule.meeting_type
+                break
+
+        with self.lock:
+            self.hits[name] += 1
+            self.classified += 1
+        return meeting_type
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"classified": self.classified, "rules": dict(self.hits)}
+
+class MeetingClassifierFactory:
+    _classifier: Optional[MeetingClassifier] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_classifier() -> MeetingClassifier:
+        """
+        Returns the process-wide classifier, built from settings on first use.
+        """
+        if MeetingClassifierFactory._classifier is None:
+            with MeetingClassifierFactory._lock:
+                if MeetingClassifierFactory._classifier is None:
+                    MeetingClassifierFactory._classifier = MeetingClassifierFactory.from_settings()
+        return MeetingClassifierFactory._classifier
+
+    @staticmethod
+    def from_settings() -> MeetingClassifier:
+        rules = []
+        # Org-specific rules come first so they can override the defaults
+        if settings.MEETING_RULES_FILE:
+            with open(settings.MEETING_RULES_FILE) as f:
+                rules.extend(ClassificationRule(**rule) for rule in json.load(f))
+
+        room_patterns = _split(settings.MEETING_ROOM_PATTERNS)
+        if room_patterns:
+            # A booked room named in the text beats a provider keyword (e.g. "Teams Room 4")
+            # unless the event carries real conference data
+            rules.append(ClassificationRule(
+                name="meeting-room", meeting_type=MeetingType.OFFLINE,
+                patterns=room_patterns, fields=["location", "rooms"], conference=False
+            ))
+        rules.append(ClassificationRule(
+            name="do-not-record", meeting_type=MeetingType.UNRECORDED,
+            patterns=DEFAULT_UNRECORDED_PATTERNS, fields=["title", "description"], online=True
+        ))
+        if settings.UNRECORDED_MAX_ATTENDEES:
+            rules.append(ClassificationRule(
+                name="small-call", meeting_type=MeetingType.UNRECORDED,
+                online=True, max_attendees=settings.UNRECORDED_MAX_ATTENDEES
+            ))
+
+        return MeetingClassifier(rules, DEFAULT_PROVIDER_PATTERNS + _split(settings.MEETING_PROVIDER_DOMAINS))
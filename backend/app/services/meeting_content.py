@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlmodel import Session, select
+from sqlalchemy import Select, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+import hashlib
+import zlib
+
+from ..config import settings
+from ..models import Meeting, MeetingContent, ContentKind
+
+# Meeting text is kept in two places: Meeting.summary holds a preview of at most
+# SUMMARY_PREVIEW_CHARS for the dashboard lists, and MeetingContent holds full texts,
+# compressed, keyed by (meeting, kind, hash of the text). Storing a text that is already
+# there only moves its stored_at forward, so the newest row of a kind is the current one.
+
+# Rows per INSERT; keeps SQLite under its bound-parameter limit
+INSERT_BATCH_SIZE = 100
+
+# Kinds whose text can be behind Meeting.summary
+SUMMARY_KINDS = (ContentKind.SUMMARY, ContentKind.DESCRIPTION)
+
+def summary_preview(text: Optional[str]) -> Optional[str]:
+    if not text or len(text) <= settings.SUMMARY_PREVIEW_CHARS:
+        return text
+    return text[:settings.SUMMARY_PREVIEW_CHARS].rstrip() + "…"
+
+def is_truncated(text: Optional[str]) -> bool:
+    return bool(text) and len(text) > settings.SUMMARY_PREVIEW_CHARS
+
+def content_row(meeting_id: int, kind: ContentKind, text: str) -> dict:
+    raw = text.encode()
+    return {
+        "meeting_id": meeting_id,
+        "kind": kind,
+        "content_hash": hashlib.sha1(raw).hexdigest(),
+        "compression": "zlib",
+        "size": len(text),
+        "data": zlib.compress(raw),
+        "stored_at": datetime.utcnow(),
+    }
+
+def read_content(content: MeetingContent) -> str:
+    return zlib.decompress(content.data).decode()
+
+def _store_statements(dialect: str, rows: List[dict]) -> list:
+    statements = []
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = rows[i:i + INSERT_BATCH_SIZE]
+        if dialect not in ("postgresql", "sqlite"):
+            statements.append(insert(MeetingContent).values(batch))
+            continue
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert_fn(MeetingContent).values(batch)
+        statements.append(statement.on_conflict_do_update(
+            index_elements=["meeting_id", "kind", "content_hash"],
+            set_={"stored_at": statement.excluded.stored_at}
+        ))
+    return statements
+
+def store_content(session: Session, rows: List[dict]):
+    """
+    Stores content rows (from content_row) in the session's transaction.
+    """
+    for statement in _store_statements(session.get_bind().dialect.name, rows):
+        session.execute(statement)
+
+def latest_content(meeting_id: int, kinds: Iterable[ContentKind]) -> Select:
+    """
+    The most recently stored MeetingContent of a meeting among `kinds`.
+    """
+    return select(MeetingContent).where(
+        MeetingContent.meeting_id == meeting_id,
+        MeetingContent.kind.in_(list(kinds))
+    ).order_by(MeetingContent.stored_at.desc()).limit(1)
+
+def full_summary(preview: Optional[str], content: Optional[MeetingContent]) -> str:
+    """
+    The full text behind a Meeting.summary preview, given the meeting's latest summary/description content.
+    Short texts are not stored separately: the preview is the whole text then.
+    """
+    if content is not None:
+        text = read_content(content)
+        if summary_preview(text) == preview:
+            return text
+    return preview or ""
+
+def compact_summaries(session: Session, batch_size: int = 500) -> int:
+    """
+    Moves summaries longer than the preview into MeetingContent and truncates them on the row.
+    Returns the number of meetings compacted. The caller commits.
+    """
+    compacted, last_id = 0, 0
+    while True:
+        meetings = session.exec(
+            select(Meeting.id, Meeting.summary).where(
+                Meeting.id > last_id,
+                func.length(Meeting.summary) > settings.SUMMARY_PREVIEW_CHARS
+            ).order_by(Meeting.id).limit(batch_size)
+        ).all()
+        if not meetings:
+            return compacted
+        # Whether a stored summary came from the calendar or the AI isn't recorded; both back the preview
+        store_content(session, [content_row(meeting_id, ContentKind.SUMMARY, summary) for meeting_id, summary in meetings])
+        session.execute(update(Meeting), [
+            {"id": meeting_id, "summary": summary_preview(summary)} for meeting_id, summary in meetings
+        ])
+        compacted += len(meetings)
+        last_id = meetings[-1][0]
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert
+
+from ..models import Meeting, MeetingParticipant
+from .calendar import to_utc_naive
+
+# Rows per INSERT; keeps SQLite under its bound-parameter limit
+INSERT_BATCH_SIZE = 200
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def participant_rows(meeting_id: int, user_id: int, start_time: datetime, participants: Iterable[str]) -> List[dict]:
+    emails = {normalize_email(email) for email in participants or [] if email and email.strip()}
+    return [
+        {"meeting_id": meeting_id, "email": email, "user_id": user_id, "start_time": to_utc_naive(start_time)}
+        for email in sorted(emails)
+    ]
+
+def replace_participants(session: Session, meeting_ids: List[int], rows: List[dict]):
+    """
+    Replaces the index rows of the given meetings with `rows` (from participant_rows).
+    """
+    if meeting_ids:
+        session.execute(delete(MeetingParticipant).where(MeetingParticipant.meeting_id.in_(meeting_ids)))
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        session.execute(insert(MeetingParticipant), rows[i:i + INSERT_BATCH_SIZE])
+
+def rebuild_participant_index(session: Session, user_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """
+    Re-derives the index from Meeting.participants, one batch of meetings at a time.
+    Returns the number of rows written. The caller commits.
+    """
+    statement = delete(MeetingParticipant)
+    if user_id is not None:
+        statement = statement.where(MeetingParticipant.user_id == user_id)
+    session.execute(statement)
+
+    written, last_id = 0, 0
+    while True:
+        query = select(Meeting.id, Meeting.user_id, Meeting.start_time, Meeting.participants).where(Meeting.id > last_id)
+        if user_id is not None:
+            query = query.where(Meeting.user_id == user_id)
+        meetings = session.exec(query.order_by(Meeting.id).limit(batch_size)).all()
+        if not meetings:
+            return written
+        rows = [row for meeting in meetings for row in participant_rows(*meeting)]
+        replace_participants(session, [], rows)
+        written += len(rows)
+        last_id = meetings[-1][0]
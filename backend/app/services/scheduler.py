@@ -1,12 +1,25 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlmodel import Session, select
+from sqlalchemy import and_, func, or_
 from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
 import json
 
-from ..database import engine
-from ..models import User, Meeting, ActionItem
+from ..config import settings
+from ..database import engine, recent_writes
+from ..models import User, Meeting, ActionItem, CalendarSyncState
 from .notification import NotificationService
+from .calendar import CalendarService
+from .calendar_sync import CalendarSyncService, SyncResult
+from .calendar_watch import CalendarWatchService
+from .google_tokens import GoogleTokenService
+from .sync_coordinator import SyncCoordinator
+from .calendar_backfill import resume_stalled_backfills
+from .action_counters import repair_action_counters
+from .meeting_archive import archive_cold_meetings
 
 scheduler = AsyncIOScheduler()
 
@@ -59,6 +72,149 @@ async def send_daily_briefs():
                 if pending_items:
                     notification_service.send_unresolved_reminders(user, pending_items)
 
+def _next_sync_interval(previous: Optional[int], result: SyncResult, upcoming_meetings: int) -> int:
+    """
+    Seconds until a user's next background sync.
+    Backs off while a calendar is quiet and tightens again when it changes;
+    a busy rest-of-day caps the interval so new meetings show up quickly.
+    """
+    min_interval = settings.BACKGROUND_SYNC_MIN_INTERVAL
+    max_interval = settings.BACKGROUND_SYNC_MAX_INTERVAL
+
+    changed = result.mode == "full" or result.changed
+    if changed:
+        interval = min_interval
+    else:
+        interval = (previous or min_interval) * 2
+
+    busy_cap = max_interval // (1 + upcoming_meetings)
+    return max(min_interval, min(interval, busy_cap, max_interval))
+
+def sync_user_calendar(user_id: int, max_age: Optional[int] = None) -> Optional[SyncResult]:
+    """
+    Syncs one user's calendar with their stored Google credentials and schedules the next run.
+    Also registers/renews push channels when webhooks are enabled.
+    Runs in a worker thread (or a webhook background task) with its own session.
+    `max_age` is passed to SyncCoordinator: a recent or in-flight sync for the user is reused.
+    """
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        if not user:
+            return None
+
+        result = None
+        try:
+            access_token = GoogleTokenService(session).get_access_token(user)
+            if access_token:
+                def run_sync() -> dict:
+                    calendar_service = CalendarService(token=access_token)
+                    sync_result = CalendarSyncService(session).sync_user(user, access_token, calendar_service)
+                    CalendarWatchService(session).ensure_channels(user, calendar_service, sync_result.calendar_ids)
+                    return sync_result.to_dict()
+
+                result = SyncResult(**SyncCoordinator().run(user_id, run_sync, max_age=max_age)[0])
+        except Exception as e:
+            print(f"--- [SCHEDULER] Calendar sync failed for user {user_id}: {e} ---")
+            session.rollback()
+
+        now = datetime.utcnow()
+        end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+        upcoming_meetings = session.exec(
+            select(func.count(Meeting.id)).where(
+                Meeting.user_id == user_id,
+                Meeting.start_time >= now,
+                Meeting.start_time <= end_of_day
+            )
+        ).one()
+
+        state = session.exec(
+            select(CalendarSyncState).where(
+                CalendarSyncState.user_id == user_id,
+                CalendarSyncState.calendar_id == "primary"
+            )
+        ).first() or CalendarSyncState(user_id=user_id, calendar_id="primary")
+        # A failed sync counts as "quiet" so a broken account backs off instead of hammering Google
+        state.sync_interval = _next_sync_interval(state.sync_interval, result or SyncResult(mode="incremental"), upcoming_meetings)
+        if result and CalendarWatchService(session).has_active_channels(user, result.calendar_ids):
+            # Changes arrive by push; polling is only a safety net (and keeps channels renewed)
+            state.sync_interval = settings.BACKGROUND_SYNC_MAX_INTERVAL
+        state.next_sync_at = now + timedelta(seconds=state.sync_interval)
+        session.add(state)
+        session.commit()
+        return result
+
+def refresh_user_calendar(user_id: int, access_token: Optional[str] = None):
+    """
+    Background refresh for a user who is looking at stale data (see /dashboard/today).
+    Uses the stored offline token when there is one, otherwise the token from the request.
+    The user is polling for the result, so their next reads go to the primary.
+    """
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        if not user:
+            return
+        if not user.google_refresh_token and access_token:
+            try:
+                SyncCoordinator().run(
+                    user_id, lambda: CalendarSyncService(session).sync_user(user, access_token).to_dict()
+                )
+            except Exception as e:
+                print(f"--- [SCHEDULER] Dashboard refresh failed for user {user_id}: {e} ---")
+            recent_writes.mark(user_id)
+            return
+
+    sync_user_calendar(user_id)
+    recent_writes.mark(user_id)
+
+async def sync_all_calendars():
+    """
+    Job to sync the calendars of every user with offline Google access whose next sync is due.
+    At most BACKGROUND_SYNC_CONCURRENCY users are synced at once.
+    """
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        due_user_ids = session.exec(
+            select(User.id)
+            .outerjoin(CalendarSyncState, and_(
+                CalendarSyncState.user_id == User.id,
+                CalendarSyncState.calendar_id == "primary"
+            ))
+            .where(
+                User.google_refresh_token != None,
+                or_(CalendarSyncState.next_sync_at == None, CalendarSyncState.next_sync_at <= now)
+            )
+        ).all()
+
+    if not due_user_ids:
+        return
+
+    print(f"--- [SCHEDULER] Background calendar sync for {len(due_user_ids)} users ---")
+    semaphore = asyncio.Semaphore(settings.BACKGROUND_SYNC_CONCURRENCY)
+
+    async def run(user_id: int):
+        async with semaphore:
+            await asyncio.to_thread(sync_user_calendar, user_id)
+
+    await asyncio.gather(*(run(user_id) for user_id in due_user_ids))
+
+async def resume_backfills():
+    """
+    Job to pick up calendar backfills interrupted by a restart.
+    """
+    await asyncio.to_thread(resume_stalled_backfills)
+
+async def repair_counters():
+    """
+    Job to correct drifted action item counters on meetings.
+    """
+    await asyncio.to_thread(repair_action_counters)
+
+async def archive_meetings():
+    """
+    Job to move meetings older than ARCHIVE_AFTER_DAYS to the archive tables.
+    """
+    await asyncio.to_thread(archive_cold_meetings)
+
 def start_scheduler():
     """
     Starts the scheduler with defined jobs.
@@ -70,7 +226,47 @@ def start_scheduler():
         id="daily_brief",
         replace_existing=True
     )
-    
+
+    if settings.BACKGROUND_SYNC_ENABLED:
+        # Polls for due users every minute; each user's own interval adapts between
+        # BACKGROUND_SYNC_MIN_INTERVAL and BACKGROUND_SYNC_MAX_INTERVAL
+        scheduler.add_job(
+            sync_all_calendars,
+            IntervalTrigger(seconds=60),
+            id="background_calendar_sync",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+
+    scheduler.add_job(
+        repair_counters,
+        CronTrigger(hour=3, minute=0),
+        id="repair_action_counters",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
+    if settings.ARCHIVE_AFTER_DAYS:
+        scheduler.add_job(
+            archive_meetings,
+            CronTrigger(hour=3, minute=30),
+            id="archive_cold_meetings",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+
+    scheduler.add_job(
+        resume_backfills,
+        IntervalTrigger(minutes=5),
+        id="resume_calendar_backfills",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
     scheduler.start()
     print("--- [SCHEDULER] Started ---")
 
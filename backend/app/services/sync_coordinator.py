@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+from sqlmodel import Session
+from sqlalchemy import and_, not_, or_, true, update
+from sqlalchemy.exc import IntegrityError
+import json
+import time
+import uuid
+
+from ..config import settings
+from ..database import engine, run_write
+from ..models import SyncLease
+
+# Seconds between lease checks while waiting for another caller's sync
+POLL_INTERVAL = 0.25
+
+class SyncInProgressError(Exception):
+    """
+    Raised when a caller gave up waiting for another caller's sync.
+    """
+    pass
+
+class SyncFailedError(Exception):
+    """
+    Raised to callers that waited on a sync which failed.
+    """
+    pass
+
+class SyncCoordinator:
+    """
+    Single-flight calendar sync per user, across threads and uvicorn workers.
+
+    A caller first looks at the user's SyncLease row: if a sync started within the last
+    `max_age` seconds has finished, or one that was in flight when the call came in has
+    finished since, its stored result is returned as is. Otherwise it tries
+    to take the lease with a conditional UPDATE; exactly one caller wins and runs the sync,
+    the others poll the row and return the winner's result (or error) once it finishes.
+    A lease left behind by a crashed worker expires after SYNC_LEASE_TTL seconds.
+
+    Lease reads and writes use their own short sessions, so they commit independently
+    of the caller's request session. The writes go through run_write (the writer thread
+    on SQLite), so waiting callers don't contend with the sync for the write lock.
+    """
+    def __init__(self, lease_ttl: Optional[int] = None, wait_timeout: Optional[int] = None):
+        self.lease_ttl = lease_ttl or settings.SYNC_LEASE_TTL
+        self.wait_timeout = wait_timeout or settings.SYNC_WAIT_TIMEOUT
+
+    def run(self, user_id: int, sync_fn: Callable[[], dict], max_age: Optional[int] = None) -> Tuple[dict, bool]:
+        """
+        Runs `sync_fn` for the user unless an equivalent sync is in flight or fresh enough.
+        `max_age` (default SYNC_FRESHNESS_SECONDS) is how old a sync may be to be reused;
+        pass 0 when the caller knows the calendar changed after any earlier sync started.
+        Returns (result, coalesced) where coalesced is True if another caller's result was reused.
+        """
+        max_age = settings.SYNC_FRESHNESS_SECONDS if max_age is None else max_age
+        requested_at = datetime.utcnow()
+        fresh_after = requested_at - timedelta(seconds=max_age)
+        deadline = time.monotonic() + self.wait_timeout
+        owner = uuid.uuid4().hex
+
+        while True:
+            lease = self._read(user_id)
+            if lease and lease.owner is None and lease.finished_at:
+                fresh = lease.started_at >= fresh_after
+                # A run that finished after this call came in is the one it waited for, however
+                # long it took; unless the caller needs a run started after its request (max_age=0)
+                waited_for = lease.finished_at >= requested_at and (max_age > 0 or fresh)
+                if lease.error is None and (fresh or waited_for):
+                    return json.loads(lease.result), True
+                # Errors are only shared with callers that were waiting on that run
+                if lease.error is not None and waited_for:
+                    raise SyncFailedError(lease.error)
+
+            if self._try_acquire(user_id, owner, self._reusable(requested_at, fresh_after, max_age)):
+                break
+            if time.monotonic() > deadline:
+                raise SyncInProgressError(f"A calendar sync for user {user_id} is already running")
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            result = sync_fn()
+        except Exception as e:
+            self._release(user_id, owner, error=str(e) or e.__class__.__name__)
+            raise
+        self._release(user_id, owner, result=json.dumps(result))
+        return result, False
+
+    def _read(self, user_id: int) -> Optional[SyncLease]:
+        with Session(engine) as session:
+            return session.get(SyncLease, user_id)
+
+    @staticmethod
+    def _reusable(requested_at: datetime, fresh_after: datetime, max_age: int):
+        """
+        The check at the top of run() as a condition on the lease row: a finished run whose
+        result (or error) the caller would take instead of syncing itself.
+        """
+        fresh = SyncLease.started_at >= fresh_after
+        waited_for = and_(SyncLease.finished_at >= requested_at, true() if max_age > 0 else fresh)
+        return and_(SyncLease.finished_at != None, or_(
+            and_(SyncLease.error == None, or_(fresh, waited_for)),
+            and_(SyncLease.error != None, waited_for)
+        ))
+
+    def _try_acquire(self, user_id: int, owner: str, reusable) -> bool:
+        now = datetime.utcnow()
+
+        def acquire(session: Session) -> bool:
+            if session.get(SyncLease, user_id) is None:
+                try:
+                    with session.begin_nested():
+                        session.add(SyncLease(user_id=user_id))
+                except IntegrityError:
+                    # Another caller created it first
+                    pass
+
+            # A run that finished between the caller's read and this update is reused, not repeated
+            statement = update(SyncLease).where(
+                SyncLease.user_id == user_id,
+                or_(
+                    and_(SyncLease.owner == None, not_(reusable)),
+                    and_(SyncLease.owner != None, SyncLease.expires_at < now)
+                )
+            ).values(
+                owner=owner,
+                started_at=now,
+                expires_at=now + timedelta(seconds=self.lease_ttl),
+                finished_at=None,
+                result=None,
+                error=None
+            )
+            return session.execute(statement).rowcount == 1
+
+        return run_write(acquire)
+
+    def _release(self, user_id: int, owner: str, result: Optional[str] = None, error: Optional[str] = None):
+        run_write(lambda session: session.execute(
+            update(SyncLease)
+            .where(SyncLease.user_id == user_id, SyncLease.owner == owner)
+            .values(owner=None, finished_at=datetime.utcnow(), result=result, error=error)
+        ))
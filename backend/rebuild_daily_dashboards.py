@@ -0,0 +1,17 @@
+import sys
+from app.database import init_db
+from app.services.daily_dashboards import rebuild_daily_dashboards
+
+# Rebuilds the DailyDashboard snapshots from the meetings, e.g. after editing meetings or
+# action items by hand. They are otherwise kept up to date as meetings and actions change.
+# Usage: python rebuild_daily_dashboards.py [user_id]
+
+def rebuild():
+    user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    init_db()
+    print(f"Rebuilding daily dashboards for {'user ' + str(user_id) if user_id else 'all users'}...")
+    written = rebuild_daily_dashboards(user_id)
+    print(f"Rebuild finished: {written} days.")
+
+if __name__ == "__main__":
+    rebuild()
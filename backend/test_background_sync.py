@@ -0,0 +1,134 @@
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Point the app at a throwaway SQLite DB and a local fake Google before importing it
+FAKE_PORT = 8765
+DB_PATH = os.path.join(tempfile.mkdtemp(), "background_sync.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["GOOGLE_TOKEN_URI"] = f"http://localhost:{FAKE_PORT}/token"
+os.environ["GOOGLE_API_ROOT"] = f"http://localhost:{FAKE_PORT}/"
+
+# Add the backend directory to sys.path so we can import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlmodel import Session, select
+from app.database import init_db, engine
+from app.models import User, Meeting, CalendarSyncState
+from app.services.scheduler import sync_all_calendars
+
+now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+FAKE_EVENTS = [
+    {
+        "id": f"fake_event_{i}",
+        "status": "confirmed",
+        "summary": f"Fake Meeting {i}",
+        "start": {"dateTime": (now + timedelta(hours=i)).isoformat() + "Z"},
+        "end": {"dateTime": (now + timedelta(hours=i, minutes=30)).isoformat() + "Z"},
+        "attendees": [{"email": "alice@example.com"}],
+    }
+    for i in range(3)
+]
+
+def fake_google_response(path):
+    if "/calendarList" in path:
+        # Only the primary calendar
+        return {"items": []}
+    query = parse_qs(urlparse(path).query)
+    if "syncToken" in query:
+        # Nothing changed since the last sync
+        return {"items": [], "nextSyncToken": "fake-sync-token"}
+    return {"items": FAKE_EVENTS, "nextSyncToken": "fake-sync-token"}
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_POST(self):
+        FakeGoogleHandler.requests_seen.append(("POST", self.path))
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if self.path.startswith("/batch/"):
+            self._batch(body)
+        else:
+            self._json({"access_token": "fake-access-token", "expires_in": 3600})
+
+    def do_GET(self):
+        FakeGoogleHandler.requests_seen.append(("GET", self.path))
+        self._json(fake_google_response(self.path))
+
+    def _batch(self, body):
+        # Answer each part of a multipart/mixed batch request with its own JSON response
+        boundary = self.headers["Content-Type"].split("boundary=")[1].strip('"')
+        parts = []
+        for part in body.split(f"--{boundary}")[1:-1]:
+            headers, request = part.strip().split("\n\n", 1)
+            content_id = [h for h in headers.splitlines() if h.lower().startswith("content-id")][0].split(":", 1)[1].strip()
+            path = request.split(" ")[1]
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(fake_google_response(path))}\r\n"
+            )
+        payload = ("".join(parts) + f"--{boundary}--").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _json(self, body):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def test_background_sync():
+    print("Testing background calendar sync against a fake Google endpoint...")
+    server = HTTPServer(("localhost", FAKE_PORT), FakeGoogleHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    init_db()
+    engine.echo = False
+    with Session(engine) as session:
+        user = User(email="background@example.com", google_refresh_token="fake-refresh-token")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        user_id = user.id
+
+    try:
+        asyncio.run(sync_all_calendars())
+
+        with Session(engine) as session:
+            meetings = session.exec(select(Meeting).where(Meeting.user_id == user_id)).all()
+            state = session.exec(select(CalendarSyncState).where(CalendarSyncState.user_id == user_id)).first()
+            user = session.get(User, user_id)
+
+        assert len(meetings) == len(FAKE_EVENTS), f"expected {len(FAKE_EVENTS)} meetings, got {len(meetings)}"
+        assert user.google_access_token == "fake-access-token"
+        assert state.sync_token == "fake-sync-token" and state.next_sync_at > datetime.utcnow()
+        print(f"✅ Synced {len(meetings)} meetings; next sync in {state.sync_interval}s.")
+
+        # Not due yet: a second run must not call Google again
+        seen = len(FakeGoogleHandler.requests_seen)
+        asyncio.run(sync_all_calendars())
+        assert len(FakeGoogleHandler.requests_seen) == seen
+        print("✅ Users are only synced when their next sync is due.")
+    except AssertionError as e:
+        print(f"❌ Background sync check failed: {e}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_background_sync()
@@ -0,0 +1,72 @@
+import sys
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import HTTPServer
+
+# Add the backend directory to sys.path so we can import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Reuses the throwaway DB and fake Google endpoint (configured on import)
+from test_background_sync import FakeGoogleHandler, FAKE_PORT
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from app.database import init_db, engine
+from app.models import User, Meeting, CalendarSyncState
+from app.main import app
+
+def notify(client, channel_id, token, resource_state="exists"):
+    # Simulates the headers-only POST Google sends to a watch channel's address
+    return client.post("/webhooks/google/calendar", headers={
+        "X-Goog-Channel-ID": channel_id,
+        "X-Goog-Channel-Token": token,
+        "X-Goog-Resource-ID": "fake-resource",
+        "X-Goog-Resource-State": resource_state,
+        "X-Goog-Message-Number": "1",
+    })
+
+def test_calendar_webhook():
+    print("Testing calendar push notifications...")
+    server = HTTPServer(("localhost", FAKE_PORT), FakeGoogleHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    init_db()
+    engine.echo = False
+    with Session(engine) as session:
+        user = User(email="webhook@example.com", google_refresh_token="fake-refresh-token")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        user_id = user.id
+        session.add(CalendarSyncState(
+            user_id=user_id,
+            calendar_id="primary",
+            channel_id="fake-channel",
+            channel_token="fake-channel-token",
+            channel_expiration=datetime.utcnow() + timedelta(days=7)
+        ))
+        session.commit()
+
+    try:
+        with TestClient(app) as client:
+            assert notify(client, "fake-channel", "wrong-token").status_code == 403
+            print("✅ Notifications with a bad channel token are rejected.")
+
+            assert notify(client, "fake-channel", "fake-channel-token", "sync").status_code == 200
+            print("✅ Channel handshake ('sync') is acknowledged.")
+
+            response = notify(client, "fake-channel", "fake-channel-token")
+            assert response.status_code == 200, response.text
+
+        with Session(engine) as session:
+            meetings = session.exec(select(Meeting).where(Meeting.user_id == user_id)).all()
+        assert meetings, "notification did not trigger a sync"
+        print(f"✅ Notification triggered a sync ({len(meetings)} meetings).")
+    except AssertionError as e:
+        print(f"❌ Webhook check failed: {e}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_calendar_webhook()
@@ -0,0 +1,117 @@
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at a throwaway SQLite DB before importing it
+DB_PATH = os.path.join(tempfile.mkdtemp(), "meeting_archive.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+# Add the backend directory to sys.path so we can import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from app.database import init_db, engine
+from app.models import User, Meeting, MeetingArchive, MeetingType, ContentKind
+from app.auth_utils import create_access_token
+from app.services.meeting_archive import MeetingArchiveService
+from app.services.meeting_content import content_row, store_content, summary_preview
+from app.main import app
+
+OLD_SUMMARY = "Archived meeting summary. " * 40 # longer than the preview, so it lives in MeetingContent
+
+def add_meeting(session, user_id, google_event_id, start_time, summary=None):
+    meeting = Meeting(
+        user_id=user_id,
+        google_event_id=google_event_id,
+        title=google_event_id,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        type=MeetingType.ONLINE,
+        summary=summary_preview(summary)
+    )
+    session.add(meeting)
+    session.commit()
+    session.refresh(meeting)
+    return meeting
+
+def test_meeting_archive():
+    print("Testing that archived meetings keep their content and ids...")
+    init_db()
+    engine.echo = False
+    with Session(engine) as session:
+        user = User(email="archive@example.com")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        user_id = user.id
+
+        archived = add_meeting(session, user_id, "old-event", datetime.utcnow() - timedelta(days=400), OLD_SUMMARY)
+        archived_id = archived.id
+        store_content(session, [content_row(archived_id, ContentKind.SUMMARY, OLD_SUMMARY)])
+        session.commit()
+
+        # The newest meeting is the one archived, so its id is the one SQLite would hand out again
+        assert MeetingArchiveService(session).archive_batch(datetime.utcnow() - timedelta(days=100), 10) == 1
+        new_id = add_meeting(session, user_id, "new-event", datetime.utcnow(), "Fresh meeting.").id
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    try:
+        assert new_id != archived_id, f"new meeting reused archived id {archived_id}"
+        print(f"✅ New meeting got id {new_id}, not the archived meeting's id {archived_id}.")
+
+        with TestClient(app) as client:
+            response = client.get(f"/meetings/{new_id}/summary", headers=headers)
+            assert response.status_code == 200, response.text
+            assert response.json()["summary"] == "Fresh meeting.", response.json()
+            assert client.get(f"/meetings/{new_id}/content/summary", headers=headers).status_code == 404
+            print("✅ The new meeting doesn't serve the archived meeting's summary.")
+
+            response = client.get(f"/meetings/{archived_id}/summary", headers=headers)
+            assert response.status_code == 200, response.text
+            assert response.json()["summary"] == OLD_SUMMARY
+            print("✅ The archived meeting still serves its full summary.")
+    except AssertionError as e:
+        print(f"❌ Meeting archive check failed: {e}")
+
+def test_open_actions_stay_live():
+    print("Testing that days with open action items are not archived...")
+    init_db()
+    engine.echo = False
+    with Session(engine) as session:
+        user = User(email="open-actions@example.com")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        user_id = user.id
+        meeting_id = add_meeting(session, user_id, "old-open-event", datetime.utcnow() - timedelta(days=300)).id
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    horizon = datetime.utcnow() - timedelta(days=100)
+    try:
+        with TestClient(app) as client:
+            response = client.post("/actions/", headers=headers, json={"meeting_id": meeting_id, "description": "Follow up"})
+            assert response.status_code == 201, response.text
+            action_id = response.json()["id"]
+
+            with Session(engine) as session:
+                assert MeetingArchiveService(session).archive_batch(horizon, 10) == 0
+                assert session.get(Meeting, meeting_id) is not None
+            print("✅ A day with an open action item stays in the live tables.")
+
+            response = client.patch(f"/actions/{action_id}", headers=headers, json={"is_completed": True})
+            assert response.status_code == 200, response.text
+            print("✅ Its action item can still be completed.")
+
+            with Session(engine) as session:
+                assert MeetingArchiveService(session).archive_batch(horizon, 10) == 1
+                archived = session.exec(select(MeetingArchive).where(MeetingArchive.id == meeting_id)).one()
+                assert archived.total_action_count == 1 and archived.open_action_count == 0
+            print("✅ Once resolved, the day is archived with its counts.")
+    except AssertionError as e:
+        print(f"❌ Open action item archive check failed: {e}")
+
+if __name__ == "__main__":
+    test_meeting_archive()
+    test_open_actions_stay_live()
@@ -47,6 +47,17 @@ export function MeetingDetailsModal({
       const content = meeting.summary || (meeting as any).description || "";
       if (content) {
           setNotes(content);
+
+          // Meeting lists only carry a preview; load the full text into the notes box
+          let cancelled = false;
+          api.getMeetingSummary(meeting.id)
+            .then((summary) => {
+              if (!cancelled && summary) setNotes(summary);
+            })
+            .catch((error) => console.error("Failed to load full summary:", error));
+          return () => {
+            cancelled = true;
+          };
       }
     }
   }, [meeting]);
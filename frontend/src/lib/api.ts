@@ -1,4 +1,4 @@
-import { DailyDashboard, Meeting, ActionItem, ActionType } from "@/types";
+import { DailyDashboard, HistoryPage, Meeting, ActionItem, ActionType } from "@/types";
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
 
@@ -69,21 +69,32 @@ export const api = {
       date: data.date,
       isResolved: data.is_resolved,
       meetings: data.meetings.map(transformMeeting),
+      syncedAt: data.synced_at,
+      refreshing: data.refreshing,
     };
   },
 
-  getPastDashboards: async (): Promise<DailyDashboard[]> => {
-    const response = await fetch(`${API_BASE_URL}/dashboard/history`, {
+  // from/to are UTC days (YYYY-MM-DD); the server defaults to the last 7 days
+  getPastDashboards: async (range: { from?: string; to?: string; cursor?: string | null } = {}): Promise<HistoryPage> => {
+    const params = new URLSearchParams();
+    if (range.from) params.set("from", range.from);
+    if (range.to) params.set("to", range.to);
+    if (range.cursor) params.set("cursor", range.cursor);
+
+    const response = await fetch(`${API_BASE_URL}/dashboard/history?${params.toString()}`, {
       headers: headers(),
     });
     if (!response.ok) throw new Error("Failed to fetch history");
     
     const data = await response.json();
-    return data.map((d: any) => ({
-      date: d.date,
-      isResolved: d.is_resolved,
-      meetings: d.meetings.map(transformMeeting),
-    }));
+    return {
+      dashboards: data.map((d: any) => ({
+        date: d.date,
+        isResolved: d.is_resolved,
+        meetings: d.meetings.map(transformMeeting),
+      })),
+      nextCursor: response.headers.get("X-Next-Cursor"),
+    };
   },
 
   processMeeting: async (meetingId: string, content: string): Promise<Meeting> => {
@@ -120,6 +131,17 @@ export const api = {
     return data.notes || "";
   },
 
+  // Meeting lists carry a preview of the summary; this returns the full text
+  getMeetingSummary: async (meetingId: string): Promise<string> => {
+    const response = await fetch(`${API_BASE_URL}/meetings/${meetingId}/summary`, {
+      headers: headers(),
+    });
+    if (!response.ok) throw new Error("Failed to fetch summary");
+
+    const data = await response.json();
+    return data.summary || "";
+  },
+
   updateActionItem: async (actionId: string, updates: Partial<ActionItem>): Promise<ActionItem> => {
     // Map frontend keys to backend keys
     const backendUpdates: any = {};
@@ -10,18 +10,43 @@ import { api } from "@/lib/api";
 import { Button } from "@/components/ui/button";
 import { RefreshCw } from "lucide-react";
 
+// UTC day strings (YYYY-MM-DD), matching how the server groups history
+const toDay = (date: Date) => date.toISOString().slice(0, 10);
+const daysBefore = (day: string, days: number) => {
+  const date = new Date(`${day}T00:00:00Z`);
+  date.setUTCDate(date.getUTCDate() - days);
+  return toDay(date);
+};
+
+// Appends an older history page; a day split across pages is joined back together
+const appendHistory = (loaded: DailyDashboard[], older: DailyDashboard[]) => {
+  const last = loaded[loaded.length - 1];
+  if (last && older.length > 0 && older[0].date === last.date) {
+    const joined = { ...last, isResolved: older[0].isResolved, meetings: [...last.meetings, ...older[0].meetings] };
+    return [...loaded.slice(0, -1), joined, ...older.slice(1)];
+  }
+  return [...loaded, ...older];
+};
+
+type HistoryRange = { from: string; to: string; cursor: string | null };
+
 const Index = () => {
   const [meetings, setMeetings] = useState<Meeting[]>([]);
   const [dashboards, setDashboards] = useState<DailyDashboard[]>([]);
+  const [historyRange, setHistoryRange] = useState<HistoryRange | null>(null);
   const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [isSyncing, setIsSyncing] = useState(false);
   const isMobile = useIsMobile();
 
-  const fetchToday = async () => {
+  const fetchToday = async (attempt = 0) => {
     try {
         const data = await api.getTodaysDashboard();
         console.log("Fetched meetings:", data.meetings);
         setMeetings(data.meetings);
+        // The server returned stored meetings and is syncing in the background; pick up the result
+        if (data.refreshing && attempt < 5) {
+            setTimeout(() => fetchToday(attempt + 1), 2000);
+        }
     } catch (error) {
         console.error("Failed to fetch today's dashboard", error);
     }
@@ -29,8 +54,11 @@ const Index = () => {
 
   const fetchHistory = async () => {
     try {
-        const data = await api.getPastDashboards();
-        setDashboards(data);
+        const to = daysBefore(toDay(new Date()), 1);
+        const from = daysBefore(to, 6);
+        const page = await api.getPastDashboards({ from, to });
+        setDashboards(page.dashboards);
+        setHistoryRange({ from, to, cursor: page.nextCursor });
     } catch (error) {
         console.error("Failed to fetch history", error);
     }
@@ -267,13 +295,26 @@ const Index = () => {
     );
   };
 
-  const handleViewMore = () => {
-    // In a real app, this would be pagination API
+  const handleViewMore = async () => {
+    if (!historyRange) return;
     setIsLoadingMore(true);
-    setTimeout(() => {
+    try {
+      // Finish the current week's pages first, then go back a week at a time
+      const range = historyRange.cursor
+        ? historyRange
+        : { from: daysBefore(historyRange.from, 7), to: daysBefore(historyRange.from, 1), cursor: null };
+      const page = await api.getPastDashboards(range);
+      setDashboards(prev => appendHistory(prev, page.dashboards));
+      setHistoryRange({ from: range.from, to: range.to, cursor: page.nextCursor });
+      if (page.dashboards.length === 0) {
+        showSuccess(`No meetings between ${range.from} and ${range.to}.`);
+      }
+    } catch (error) {
+      console.error("Failed to load more history", error);
+      showError("Failed to load more history.");
+    } finally {
       setIsLoadingMore(false);
-      showSuccess("No more history in MVP.");
-    }, 1000);
+    }
   };
 
 
@@ -21,4 +21,12 @@ export interface DailyDashboard {
   date: string;
   isResolved: boolean;
   meetings: Meeting[];
+  syncedAt?: string | null;
+  refreshing?: boolean;
+}
+
+// One page of /dashboard/history; nextCursor continues the same from/to range
+export interface HistoryPage {
+  dashboards: DailyDashboard[];
+  nextCursor: string | null;
 }
\ No newline at end of file